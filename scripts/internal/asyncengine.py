@@ -0,0 +1,240 @@
+from .utility import *
+from .execution import *
+from .execution import _count_process_group_members
+from .invocation import *
+from .prefetch import *
+from .pruning import get_dominating_failure, save_inferred_timeout, detect_memout
+from .resultcache import *
+from .scheduler import get_worker_slots
+import asyncio, traceback
+
+# The interval (in seconds) at which processes are polled on systems without pidfd support
+PROCESS_POLL_INTERVAL = 0.05
+
+class AsyncCommandExecution(CommandExecution):
+    """
+    The execution of a single command line argument that does not block the asyncio event loop while the command runs.
+    The process is reaped using os.wait4 (instead of asyncio's child watchers) so that the same resources as for a CommandExecution are measured.
+    """
+    async def wait_async(self, cgroup):
+        """ Waits until the process terminates and measures the resources used by the process (and its children). """
+        if hasattr(os, "pidfd_open"):
+            # the pidfd becomes readable as soon as the process terminated
+            loop = asyncio.get_running_loop()
+            pidfd = os.pidfd_open(self.proc.pid)
+            terminated = loop.create_future()
+            loop.add_reader(pidfd, lambda: terminated.done() or terminated.set_result(None))
+            try:
+                await terminated
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+            pid, status, rusage = os.wait4(self.proc.pid, 0)
+        else:
+            while True:
+                pid, status, rusage = os.wait4(self.proc.pid, os.WNOHANG)
+                if pid != 0:
+                    break
+                await asyncio.sleep(PROCESS_POLL_INTERVAL)
+        self.record_exit(status, rusage, cgroup)
+
+    async def watch_output_size_async(self):
+        """ Kills the process as soon as its output exceeds the maximum output size. """
+        while True:
+            await asyncio.sleep(OUTPUT_SIZE_CHECK_INTERVAL)
+            if self.get_output_size() > self.max_output_size:
+                self.output_limit_exceeded = True
+                self.signal_process_group(signal.SIGKILL)
+                return
+
+    async def sample_async(self, sampler):
+        loop = asyncio.get_running_loop()
+        while True:
+            # scanning /proc is done in a separate thread so that the event loop is not blocked
+            await loop.run_in_executor(None, sampler.sample)
+            await asyncio.sleep(sampler.interval)
+
+    async def count_process_group_members_async(self):
+        """ Returns the number of (running) processes of the command. Scanning /proc is done in a separate thread so that the event loop is not blocked. """
+        return await asyncio.get_running_loop().run_in_executor(None, _count_process_group_members, self.proc.pid)
+
+    async def kill_leftover_processes_async(self):
+        """ See CommandExecution.kill_leftover_processes """
+        deadline = time.time() + (TERMINATION_GRACE_PERIOD if self.timeout else 0.0)
+        leftovers = await self.count_process_group_members_async()
+        while leftovers > 0 and time.time() < deadline:
+            await asyncio.sleep(0.1)
+            leftovers = await self.count_process_group_members_async()
+        if leftovers > 0:
+            self.signal_process_group(signal.SIGKILL)
+            for i in range(50):
+                if await self.count_process_group_members_async() == 0:
+                    break
+                await asyncio.sleep(0.1)
+        return leftovers
+
+    async def run_async(self, command_line_str, time_limit, spool_dir = None, max_output_size = None, memory_limit = None, sampling_interval = None, setup_fn = None, rlimit_kind = "data"):
+        """
+        Runs the given command line (see CommandExecution.run). The given function (if any) is called with the pid of the new process before the command starts (see CommandExecution.start).
+        Starting the process (which includes creating its cgroup and applying its limits) and removing its cgroup are done in a separate thread so that the event loop is not blocked.
+        """
+        loop = asyncio.get_running_loop()
+        starter = loop.run_in_executor(None, self.start, command_line_str, spool_dir, max_output_size, memory_limit, setup_fn, rlimit_kind)
+        try:
+            cgroup = await asyncio.shield(starter)
+        except asyncio.CancelledError:
+            # the process is started anyway and thus has to be killed right away
+            cgroup = await starter
+            self.signal_process_group(signal.SIGKILL)
+            await loop.run_in_executor(None, self.proc.wait)
+            self.return_code = self.proc.returncode
+            self.leftover_processes = await loop.run_in_executor(None, self.kill_leftover_processes)
+            if cgroup is not None:
+                await loop.run_in_executor(None, cgroup.remove)
+            raise
+        start_time = time.time()
+        sampler = None
+        helper_tasks = []
+        if sampling_interval is not None and os.path.isdir("/proc"):
+            sampler = ProcessGroupSampler(self.proc.pid, sampling_interval)
+            helper_tasks.append(asyncio.ensure_future(self.sample_async(sampler)))
+        if max_output_size is not None:
+            helper_tasks.append(asyncio.ensure_future(self.watch_output_size_async()))
+        waiter = asyncio.ensure_future(self.wait_async(cgroup))
+        cancelled = True
+        try:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), time_limit if time_limit is not None and time_limit > 0 else None)
+            except asyncio.TimeoutError:
+                # Terminate all processes of the command. Processes that are still running after the grace period are killed.
+                self.timeout = True
+                self.signal_process_group(signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), TERMINATION_GRACE_PERIOD)
+                except asyncio.TimeoutError:
+                    self.signal_process_group(signal.SIGKILL)
+                    await waiter
+            cancelled = False
+        except Exception as e:
+            self.output = self.output + "Error when executing the command:\n{}\n".format(e)
+            cancelled = False
+        finally:
+            for task in helper_tasks:
+                task.cancel()
+            self.wall_time = time.time() - start_time
+            if sampler is not None:
+                self.samples = sampler.samples
+            if self.proc.returncode is None:
+                # waiting failed or got cancelled (e.g. by CTRL+C). The processes are in their own session and thus have to be killed explicitly
+                waiter.cancel()
+                self.signal_process_group(signal.SIGKILL)
+                # reaping is done in a separate thread so that the event loop (and thus the timeouts of all other executions) is not blocked
+                await asyncio.shield(loop.run_in_executor(None, self.proc.wait))
+            self.return_code = self.proc.returncode
+            # ensure that no process of this command keeps running during subsequent executions
+            if cancelled:
+                # the task got cancelled, i.e., we can not rely on awaiting the grace period within the event loop. The (blocking) grace period is awaited in a separate thread instead
+                self.leftover_processes = await asyncio.shield(loop.run_in_executor(None, self.kill_leftover_processes))
+            else:
+                self.leftover_processes = await self.kill_leftover_processes_async()
+            if cgroup is not None:
+                await asyncio.shield(loop.run_in_executor(None, cgroup.remove))
+        self.read_output()
+
+class AsyncExecution(Execution):
+    """ The execution of an invocation that does not block the asyncio event loop. The results are the same as for an Execution. """
+    async def run_async(self, warm_up_run = False, spool_dir = None, max_output_size = None, sampling_interval = None, setup_fn = None, rlimit_kind = "data"):
+        """ Executes the commands of the invocation (see Execution.run). The given function (if any) is called with the pid of each new process before the command starts (see CommandExecution.start). """
+        self.reset()
+        for command in self.invocation.commands:
+            if warm_up_run:
+                # do a warm-up run first to hopefully decrease file i/o delay
+                dryrun = AsyncCommandExecution()
+                await dryrun.run_async(command, 5, spool_dir, max_output_size, self.invocation.memory_limit, None, setup_fn, rlimit_kind)
+                dryrun.close()
+            command_execution = AsyncCommandExecution()
+            await command_execution.run_async(command, self.invocation.time_limit - self.wall_time, spool_dir, max_output_size, self.invocation.memory_limit, sampling_interval, setup_fn, rlimit_kind)
+            if not self.add_command_execution(command, command_execution, max_output_size):
+                break
+
+async def _save_execution_async(settings, invocation, execution, cache_key):
+    loop = asyncio.get_running_loop()
+    detect_memout(execution)
+    execution_result = await loop.run_in_executor(None, save_execution, settings, invocation, execution)
+    if cache_key is not None:
+        await loop.run_in_executor(None, store_cached_result, settings, invocation, cache_key)
+    return execution_result
+
+async def _execute_invocation_async(settings, invocation, slots):
+    """
+    Executes the given invocation using one of the given worker slots as soon as one is available and saves the results.
+    As in pruning.execute_invocation, dominated invocations are skipped first and cached results are reused second.
+    """
+    loop = asyncio.get_running_loop()
+    cache_key = None
+    if settings.result_cache_dir() is not None:
+        # hashing the input files is done in a separate thread (and before waiting for a slot) so that neither the event loop nor a slot is blocked
+        cache_key = await loop.run_in_executor(None, get_result_cache_key, invocation)
+    slot = await slots.get()
+    try:
+        # the executions of coarser precisions that started earlier might have finished in the meantime
+        dominating_identifier = get_dominating_failure(settings, invocation) if settings.prune_dominated_invocations() else None
+        if dominating_identifier is not None:
+            return await loop.run_in_executor(None, save_inferred_timeout, settings, invocation, dominating_identifier)
+        if cache_key is not None and not settings.force_execution():
+            execution_result = await loop.run_in_executor(None, load_cached_result, settings, invocation, cache_key)
+            if execution_result is not None:
+                return execution_result
+        strategy = settings.warm_up_strategy()
+        # file i/o is done in a separate thread so that the event loop is not blocked
+        await loop.run_in_executor(None, prefetch_invocation, invocation, strategy)
+        execution = AsyncExecution(invocation)
+        await execution.run_async(strategy == "dry-run", settings.logs_dir(), settings.max_log_size(), settings.sampling_interval(), slot.apply, settings.memory_rlimit_kind())
+    finally:
+        slots.put_nowait(slot)
+    return await _save_execution_async(settings, invocation, execution, cache_key)
+
+async def _run_invocations_async(settings, invocations, journal):
+    worker_slots = get_worker_slots(settings)
+    print("\nExecuting invocations using an asyncio event loop with {} concurrent executions:\n\t{}".format(len(worker_slots), "\n\t".join([str(slot) for slot in worker_slots])))
+    slots = asyncio.Queue()
+    for slot in worker_slots:
+        slots.put_nowait(slot)
+    ensure_directory(settings.logs_dir())
+    # Tasks acquire slots in the order in which they are created, i.e., invocations are started in their original order
+    tasks = [asyncio.ensure_future(_execute_invocation_async(settings, invocation, slots)) for invocation in invocations]
+    task_indices = dict([(task, index) for index, task in enumerate(tasks)])
+    progressbar = Progressbar(len(invocations), "Executing invocations")
+    num_finished = 0
+    try:
+        pending = set(tasks)
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                num_finished += 1
+                progressbar.print_progress(num_finished)
+                invocation = invocations[task_indices[task]]
+                if task.exception() is not None:
+                    print("\nERROR while processing invocation #{}: {}\n{}".format(task_indices[task], invocation.get_identifier(), "".join(traceback.format_exception(type(task.exception()), task.exception(), task.exception().__traceback__))))
+                elif journal is not None:
+                    journal.record(invocation.get_identifier(), task.result())
+    except asyncio.CancelledError:
+        print("\nInterrupt while processing invocations ({} of {} finished).".format(num_finished, len(invocations)))
+        # cancelling the tasks kills the running commands
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def run_invocations_async(settings, invocations, journal = None):
+    """
+    Executes the given invocations concurrently from a single process using an asyncio event loop.
+    Each running invocation gets one of the worker slots (i.e., its own cores and memory limit).
+    The log and json files are the same as for a sequential execution. Finished invocations are recorded in the given journal (if any).
+    Returns false if the execution got interrupted.
+    """
+    try:
+        asyncio.run(_run_invocations_async(settings, invocations, journal))
+    except KeyboardInterrupt:
+        return False
+    return True
@@ -2,6 +2,7 @@
 
 from .utility import *
 from . import benchmarksets
+from .referenceresults import *
 
 class Benchmark(object):
     """ This class represents a benchmark, that is
@@ -77,6 +78,10 @@ class Benchmark(object):
     def get_identifier(self):
         return "{}.{}.{}".format(self.get_model_short_name(), self.get_parameter_values_string(), self.get_property_name())
 
+    def get_instance_identifier(self):
+        """ Returns an identifier of the model file and the parameter values, i.e., benchmarks with the same instance identifier only differ in their property. """
+        return "{}.{}.{}".format(self.get_model_short_name(), self.model_file_index, self.open_parameter_index)
+
     def get_model_type(self):
         return self.index_json["type"]
 
@@ -376,29 +381,14 @@ class Benchmark(object):
         return "https://github.com/moves-rwth/sound-mopmc/tree/main/qcomp/benchmarks/{}/{}/{}".format(self.get_model_type(), self.get_model_short_name(), self.get_janifilename())
         
     def store_reference_result(self, result, cfg):
-        ref_json = load_json(os.path.join(sys.path[0], "internal/reference_results.json"))
-        changed = False
-        if self.get_identifier() in ref_json:
-            if str(result) != str(ref_json[self.get_identifier()]["value"]):
-                print("Inconsistent reference result for {}.{}.\nGot {}\nbut entry is {}".format(cfg,self.get_identifier(), result, ref_json[self.get_identifier()]))
-            if cfg not in ref_json[self.get_identifier()]["cfgs"]:
-                ref_json[self.get_identifier()]["cfgs"].append(cfg)
-                changed = True
-        else:
-            print("Found new ref res for {} using config {}".format(self.get_identifier(), cfg))
-            ref_json[self.get_identifier()] = dict()
-            ref_json[self.get_identifier()]["value"] = str(result)
-            ref_json[self.get_identifier()]["cfgs"] = [cfg]
-            changed = True
-        if changed:
-            save_json(ref_json, os.path.join(sys.path[0], "internal/reference_results.json"))
+        get_reference_result_store().store(self.get_identifier(), result, cfg)
 
     def get_reference_result(self):
-        res = None
-        ref_json = load_json(os.path.join(sys.path[0], "internal/reference_results.json"))
-        if self.get_identifier() in ref_json:
-            res = ref_json[self.get_identifier()]["value"]
-        else:
+        store = get_reference_result_store()
+        if store.contains(self.get_identifier()):
+            return store.get_value(self.get_identifier())
+        if not hasattr(self, "_index_reference_result"):
+            res = None
             file_json = self.index_json["files"][self.model_file_index]
             if "open-parameter-values" in file_json:
                 open_par_json = file_json["open-parameter-values"]
@@ -406,15 +396,9 @@ class Benchmark(object):
                     ref_results = open_par_json[self.open_parameter_index]["results"]
                     for r in ref_results:
                         if r["property"] == self.get_property_name():
-                            res = r["value"]        
-        if res is None:
-            return None     
-        elif is_bool(res):
-            return bool(res)
-        elif is_interval(res):
-            return res
-        else:
-            return try_to_number(res)
+                            res = r["value"]
+            self._index_reference_result = parse_reference_result(res)
+        return self._index_reference_result
 
     def has_reference_result(self):
         return self.get_reference_result() is not None
@@ -512,12 +496,33 @@ class Benchmark(object):
 
         self.get_max_num_states()
 
+def get_model_benchmarks(settings, index_json, index_json_file = "index.json"):
+    """ Creates a list of benchmark objects for all instances and properties of the model with the given index json structure. """
+    benchmarks = []
+    # run over all available properties
+    if not "properties" in index_json:
+        raise ValueError('Can not find properties array in file ' + index_json_file + '.')
+    for property_index in range(len(index_json["properties"])):
+        # run over all available file indices
+        if not "files" in index_json:
+            raise ValueError('Can not find files array in file ' + index_json_file + '.')
+        for model_file_index in range(len(index_json["files"])):
+            file_json = index_json["files"][model_file_index]
+            # run over all available open-parameter-values
+            if not "open-parameter-values" in file_json or len(file_json["open-parameter-values"]) == 0:
+                open_parameter_indices = [0]
+            else:
+                open_parameter_indices = range(len(file_json["open-parameter-values"]))
+            for open_parameter_index in open_parameter_indices:
+                benchmarks.append(Benchmark(settings, index_json, model_file_index, open_parameter_index, property_index))
+    return benchmarks
+
 def get_all_benchmarks(settings, benchmark_directories):
     """ Creates a list of benchmark objects from the given benchmark directories. """
     dirname = os.path.curdir
     if os.path.isfile(benchmark_directories):
         dirname = os.path.dirname(benchmark_directories)
-        benchmark_directories = load_json(benchmark_directories)
+        benchmark_directories = load_index_json(benchmark_directories)
 
     benchmarks = []
     for p in benchmark_directories:
@@ -530,27 +535,45 @@ def get_all_benchmarks(settings, benchmark_directories):
         index_json_file = os.path.join(os.path.join(dirname, index_json_file), "index.json")
         if not os.path.isfile(index_json_file):
             raise ValueError('Unknown index file for benchmark: {}'.format(index_json_file))
-        index_json = load_json(index_json_file)
-        # run over all available properties
-        if not "properties" in index_json:
-            raise ValueError('Can not find properties array in file ' + index_json_file + '.')
-        for property_index in range(len(index_json["properties"])):
-            # run over all available file indices
-            if not "files" in index_json:
-                raise ValueError('Can not find files array in file ' + index_json_file + '.')
-            for model_file_index in range(len(index_json["files"])):
-                file_json = index_json["files"][model_file_index]
-                # run over all available open-parameter-values
-                if not "open-parameter-values" in file_json or len(file_json["open-parameter-values"]) == 0:
-                    open_parameter_indices = [0]
-                else:
-                    open_parameter_indices = range(len(file_json["open-parameter-values"]))
-                for open_parameter_index in open_parameter_indices:
-                    benchmarks.append(Benchmark(settings, index_json, model_file_index, open_parameter_index, property_index))
+        benchmarks += get_model_benchmarks(settings, load_index_json(index_json_file), index_json_file)
     return benchmarks
 
+# Parsed index.json files (path -> json structure) and benchmark registries (benchmark directory -> identifier -> benchmark), shared within the process
+_index_jsons = dict()
+_benchmark_registries = dict()
+
+def load_index_json(path : str):
+    """ Returns the contents of the given index.json file. Each file is only parsed once. """
+    path = os.path.realpath(path)
+    if path not in _index_jsons:
+        _index_jsons[path] = load_json(path)
+    return _index_jsons[path]
+
+def get_benchmark_registry(settings):
+    """ Returns a dictionary that maps the identifiers of all benchmarks within the benchmark directory to the corresponding benchmark objects. The dictionary is only built once. """
+    benchmark_dir = os.path.realpath(set_mdpmc_dir(settings.benchmark_dir()))
+    if benchmark_dir not in _benchmark_registries:
+        registry = dict()
+        for p in load_index_json(os.path.join(benchmark_dir, "index.json")):
+            index_json_file = os.path.join(benchmark_dir, p["path"], "index.json")
+            try:
+                model_benchmarks = get_model_benchmarks(settings, load_index_json(index_json_file), index_json_file)
+            except (OSError, ValueError, KeyError):
+                continue # get_benchmark_from_id reports a proper error when a benchmark of this model is requested
+            for benchmark in model_benchmarks:
+                registry.setdefault(benchmark.get_identifier(), benchmark)
+        _benchmark_registries[benchmark_dir] = registry
+    return _benchmark_registries[benchmark_dir]
+
 def get_benchmark_from_id(settings, id):
     """ Returns the benchmark object associated with the given identifier """
+    registry = get_benchmark_registry(settings)
+    if id in registry:
+        return registry[id]
+    return find_benchmark_from_id(settings, id)
+
+def find_benchmark_from_id(settings, id):
+    """ Searches the index files for the benchmark object associated with the given identifier. Use get_benchmark_from_id for faster lookups. """
     id_info = id.split(".")
     short_name = id_info[0]
     parameter_definition_str = ".".join(id_info[1:-1])
@@ -558,12 +581,12 @@ def get_benchmark_from_id(settings, id):
     benchmark_dir = set_mdpmc_dir(settings.benchmark_dir())
 
     # find the correct benchmark
-    benchmark_directories = load_json(os.path.join(benchmark_dir, "index.json"))
+    benchmark_directories = load_index_json(os.path.join(benchmark_dir, "index.json"))
     for p in benchmark_directories:
         model_path = os.path.join(benchmark_dir, p["path"])
         # get the correct index.json file
         if short_name == os.path.basename(model_path):
-            model_index_json = load_json(os.path.join(model_path, "index.json"))
+            model_index_json = load_index_json(os.path.join(model_path, "index.json"))
             # get the parameter_definition as a map
             parameter_definition = OrderedDict()
             if parameter_definition_str.strip() != "":
@@ -606,8 +629,3 @@ def get_benchmark_from_id(settings, id):
                     raise LookupError("Unable to find parameter definition '{}' for model '{}'.".format(parameter_definition, short_name))
             raise LookupError("Unable to find property '{}' for model '{}'.".format(property_name, short_name))
     raise LookupError("Unable to find benchmark with name '{}'.".format(short_name))
-
-
-
-
-
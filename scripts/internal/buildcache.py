@@ -0,0 +1,65 @@
+from .utility import *
+import hashlib, re
+
+# The script to which the commands that fill the build cache are appended
+BUILD_CACHE_SCRIPT = "buildcache.sh"
+
+_file_hashes = dict() # path -> (mtime, size, sha256)
+
+def get_file_hash(path : str):
+    """ Returns the sha256 hash of the content of the given file. Hashes are only recomputed if the file has changed. """
+    stat = os.stat(path)
+    if path not in _file_hashes or _file_hashes[path][:2] != (stat.st_mtime_ns, stat.st_size):
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, sha.hexdigest())
+    return _file_hashes[path][2]
+
+def get_build_cache_key(binary : str, input_files, arguments : str):
+    """
+    Computes the key of a built model. It covers the content of the tool binary (if it exists), the content of the input files, and the arguments that influence model building (e.g. the constant definitions).
+    """
+    sha = hashlib.sha256()
+    for path in [binary] + input_files:
+        path = set_mdpmc_dir(path)
+        sha.update(os.path.basename(path).encode('utf-8'))
+        if os.path.isfile(path):
+            sha.update(get_file_hash(path).encode('utf-8'))
+        elif path != set_mdpmc_dir(binary):
+            raise AssertionError("Input file '{}' does not exist.".format(path))
+    sha.update(arguments.encode('utf-8'))
+    return sha.hexdigest()
+
+# Identifiers that may occur in a PRISM property that only refers to labels and reward models
+_PROPERTY_KEYWORDS = set(["P", "Pmin", "Pmax", "R", "Rmin", "Rmax", "S", "LRA", "F", "G", "U", "W", "X", "C", "I", "multi", "min", "max", "true", "false"])
+
+def get_prism_property_formula(property_file : str, property_name : str):
+    """ Returns the formula of the property with the given name in the given PRISM property file (or None if there is no such property). """
+    with open(set_mdpmc_dir(property_file), 'r') as f:
+        content = f.read()
+    content = re.sub(r"//[^\n]*", "", content) # remove comments
+    match = re.search(r'"{}"\s*:([^;]*);'.format(re.escape(property_name)), content)
+    return None if match is None else match.group(1)
+
+def is_property_supported_by_explicit_model(property_file : str, property_name : str):
+    """
+    Returns true if the given property can be checked on an exported explicit model, i.e., if it only refers to labels and reward models (and not to variables, constants or formulas, which are not preserved in the exported model).
+    """
+    formula = get_prism_property_formula(property_file, property_name)
+    if formula is None:
+        return False
+    formula_without_strings = re.sub(r'"[^"]*"', "", formula)
+    identifiers = re.findall(r"[A-Za-z_][A-Za-z_0-9]*", re.sub(r"\d+(\.\d*)?([eE][-+]?\d+)?", "", formula_without_strings))
+    return all([i in _PROPERTY_KEYWORDS for i in identifiers])
+
+def request_build(build_command : str):
+    """ Appends the given command to the build cache script (unless it is already present). """
+    if os.path.isfile(BUILD_CACHE_SCRIPT):
+        with open(BUILD_CACHE_SCRIPT, 'r') as script:
+            if build_command in script.read().split("\n"):
+                return
+    with open(BUILD_CACHE_SCRIPT, 'a') as script:
+        script.write(build_command + "\n")
+    print("Required model build appended to file '{}'".format(BUILD_CACHE_SCRIPT))
@@ -0,0 +1,170 @@
+from .utility import *
+import threading
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# The leaf cgroup that takes the processes of the cgroup of the harness (see get_execution_parent_dir)
+HARNESS_CGROUP_NAME = "mdpmc-harness"
+
+def _read_key_values(path : str):
+    """ Reads a cgroup file with lines of the form '<key> <value>' """
+    result = dict()
+    with open(path, 'r') as f:
+        for line in f:
+            key_value = line.split()
+            if len(key_value) == 2:
+                result[key_value[0]] = int(key_value[1])
+    return result
+
+def get_own_cgroup_dir():
+    """ Returns the directory of the (cgroup v2) cgroup of the current process or None if cgroup v2 is not available. """
+    if not os.path.isfile(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+        return None # no cgroup v2 (unified hierarchy) mounted
+    try:
+        with open("/proc/self/cgroup", 'r') as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return os.path.join(CGROUP_ROOT, line[3:].strip().lstrip("/"))
+    except OSError:
+        pass
+    return None
+
+class Cgroup(object):
+    """ A (cgroup v2) cgroup that contains a single command execution and all processes spawned from it. """
+    def __init__(self, path : str):
+        self.path = path
+
+    def add_process(self, pid : int):
+        """ Moves the process with the given pid into this cgroup. Processes that it spawns afterwards are in this cgroup as well. Returns false if this is not possible. """
+        try:
+            with open(os.path.join(self.path, "cgroup.procs"), 'w') as f:
+                f.write(str(pid))
+        except OSError:
+            return False
+        return True
+
+    def set_memory_limit(self, memory_limit):
+        """ Limits the memory (in MB) of the processes in this cgroup. Swapping is disabled so that the limit can not be circumvented. Returns false if this is not possible. """
+        try:
+            with open(os.path.join(self.path, "memory.max"), 'w') as f:
+                f.write(str(int(memory_limit) * 1024 * 1024))
+        except OSError:
+            return False
+        if os.path.isfile(os.path.join(self.path, "memory.swap.max")):
+            try:
+                with open(os.path.join(self.path, "memory.swap.max"), 'w') as f:
+                    f.write("0")
+            except OSError:
+                pass
+        return True
+
+    def get_statistics(self):
+        """ Returns the user time, the system time (both in seconds), the peak memory usage (in MB), and the number of OOM kills. Entries that are not available are None. """
+        user_time, system_time, peak_memory, oom_kills = None, None, None, None
+        try:
+            cpu_stat = _read_key_values(os.path.join(self.path, "cpu.stat"))
+            user_time = cpu_stat["user_usec"] / 1000000.0
+            system_time = cpu_stat["system_usec"] / 1000000.0
+        except (OSError, KeyError):
+            pass
+        try:
+            with open(os.path.join(self.path, "memory.peak"), 'r') as f:
+                peak_memory = int(f.read()) / (1024.0 * 1024.0)
+        except (OSError, ValueError):
+            pass
+        try:
+            oom_kills = _read_key_values(os.path.join(self.path, "memory.events"))["oom_kill"]
+        except (OSError, KeyError):
+            pass
+        return user_time, system_time, peak_memory, oom_kills
+
+    def remove(self):
+        """ Kills all remaining processes in this cgroup and removes it. """
+        try:
+            if os.path.isfile(os.path.join(self.path, "cgroup.kill")):
+                with open(os.path.join(self.path, "cgroup.kill"), 'w') as f:
+                    f.write("1")
+            for i in range(50):
+                try:
+                    os.rmdir(self.path)
+                    return
+                except OSError:
+                    time.sleep(0.1) # processes might still be terminating
+        except OSError:
+            pass
+
+def get_execution_parent_dir():
+    """
+    Returns the directory of the cgroup below which the cgroups of executions are created, i.e., the cgroup of the current process.
+    Due to the 'no internal processes' rule of cgroup v2, the memory controller can only be enabled for the children of a (non-root) cgroup without processes.
+    Thus, all processes of the cgroup of the current process are moved into its leaf cgroup HARNESS_CGROUP_NAME first.
+    Returns None if this is not possible, e.g. because the cgroup has not been delegated to the current user.
+    """
+    own_dir = get_own_cgroup_dir()
+    if own_dir is None:
+        return None
+    if os.path.basename(own_dir) == HARNESS_CGROUP_NAME:
+        return os.path.dirname(own_dir) # already moved, e.g. by the process that forked the current one
+    if os.path.normpath(own_dir) == os.path.normpath(CGROUP_ROOT):
+        return own_dir # the root cgroup may contain processes and have children with controllers
+    try:
+        leaf_dir = os.path.join(own_dir, HARNESS_CGROUP_NAME)
+        if not os.path.isdir(leaf_dir):
+            os.mkdir(leaf_dir)
+        with open(os.path.join(own_dir, "cgroup.procs"), 'r') as f:
+            pids = f.read().split()
+        for pid in pids:
+            try:
+                with open(os.path.join(leaf_dir, "cgroup.procs"), 'w') as f:
+                    f.write(pid)
+            except OSError:
+                pass # the process terminated in the meantime
+        with open(os.path.join(own_dir, "cgroup.subtree_control"), 'w') as f:
+            f.write("+memory")
+    except OSError:
+        return None
+    return own_dir
+
+_cgroups_available = None
+_execution_parent_dir = None
+_num_created_cgroups = 0
+# executions might be started from several threads at once (e.g. by the asyncio engine)
+_lock = threading.Lock()
+
+def _disable_cgroups(reason : str):
+    global _cgroups_available
+    _cgroups_available = False
+    print("Warning: Unable to create cgroups for executions ({}). Resources are measured using rusage and memory limits are enforced using rlimits.".format(reason))
+
+def create_execution_cgroup():
+    """
+    Creates a new cgroup (as a child of the cgroup of the current process, see get_execution_parent_dir) for the execution of a command.
+    Returns None if this is not possible, e.g. because cgroup v2 is not available or the cgroup has not been delegated to the current user. A warning is printed the first time this happens.
+    """
+    with _lock:
+        return _create_execution_cgroup()
+
+def _create_execution_cgroup():
+    global _cgroups_available, _execution_parent_dir, _num_created_cgroups
+    if _cgroups_available == False:
+        return None
+    if _execution_parent_dir is None:
+        if get_own_cgroup_dir() is None:
+            _disable_cgroups("cgroup v2 is not available")
+            return None
+        _execution_parent_dir = get_execution_parent_dir()
+        if _execution_parent_dir is None:
+            _disable_cgroups("the cgroup of this process has not been delegated to the current user")
+            return None
+    _num_created_cgroups += 1
+    path = os.path.join(_execution_parent_dir, "mdpmc-{}-{}".format(os.getpid(), _num_created_cgroups))
+    try:
+        os.mkdir(path)
+    except OSError:
+        _disable_cgroups("unable to create '{}'".format(path))
+        return None
+    if not os.path.isfile(os.path.join(path, "memory.peak")):
+        Cgroup(path).remove()
+        _disable_cgroups("the memory controller is not available for '{}'".format(_execution_parent_dir))
+        return None
+    _cgroups_available = True
+    return Cgroup(path)
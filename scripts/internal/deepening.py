@@ -0,0 +1,76 @@
+from .utility import *
+from .invocation import *
+from datetime import datetime
+
+def get_round_time_limits(settings, invocation):
+    """
+    Returns the time limits of the rounds in which the given invocation is executed, i.e., geometrically increasing time limits starting at the initial time limit of the settings and ending at the time limit of the invocation.
+    The time limits of batched invocations are scaled by the number of benchmarks in the batch.
+    """
+    initial_time_limit = settings.initial_time_limit()
+    if initial_time_limit is None:
+        return [invocation.time_limit]
+    time_limit = initial_time_limit * len(invocation.get_benchmark_ids())
+    time_limits = []
+    while time_limit < invocation.time_limit:
+        time_limits.append(time_limit)
+        time_limit *= settings.time_limit_factor()
+    time_limits.append(invocation.time_limit)
+    return time_limits
+
+def _get_round_result_files(settings, invocation):
+    """ Returns the json files of the execution results of the given invocation (one for each benchmark of a batch). """
+    if len(invocation.batch) == 0:
+        return [os.path.join(settings.logs_dir(), invocation.get_identifier() + ".json")]
+    return [os.path.join(settings.logs_dir(), invocation.get_identifier(benchmark_id) + ".json") for benchmark_id in invocation.batch]
+
+def _merge_round_results(settings, invocation, rounds, start_time):
+    """
+    Adds the given summaries of the previous rounds and a summary of the current round to the execution results of the given invocation.
+    Returns the (updated) execution results or None if the invocation has not been executed in the current round (e.g. due to an interrupt or an error).
+    """
+    result_files = _get_round_result_files(settings, invocation)
+    if not all([os.path.isfile(f) and os.path.getmtime(f) >= start_time for f in result_files]):
+        return None
+    results = [load_json(f) for f in result_files]
+    rounds.append(OrderedDict([("time-limit", results[0]["time-limit"]), ("wallclock-time", results[0].get("wallclock-time")), ("timeout", results[0].get("timeout", False))]))
+    for result, result_file in zip(results, result_files):
+        result["rounds"] = rounds
+        save_json(result, result_file)
+    return results[0]
+
+def run_invocations_in_rounds(settings, invocations, journal, execute_invocations):
+    """
+    Executes the given invocations in rounds with increasing time limits (see get_round_time_limits). Each round only executes the invocations that timed out in the previous round.
+    The execution results (and the log) of an invocation are the ones of its last round. They list the time limit, the wall time, and the timeout of every round under 'rounds'.
+    The given function executes the invocations of a round and returns false if the execution got interrupted. Invocations are recorded in the given journal (if any) once they are finished in their last round.
+    """
+    time_limits = dict([(invocation.get_identifier(), get_round_time_limits(settings, invocation)) for invocation in invocations])
+    rounds = dict([(invocation.get_identifier(), []) for invocation in invocations])
+    remaining = invocations
+    round_index = 0
+    while len(remaining) > 0:
+        round_invocations = []
+        for invocation in remaining:
+            round_invocation = Invocation(invocation.to_json())
+            round_invocation.time_limit = time_limits[invocation.get_identifier()][round_index]
+            round_invocations.append(round_invocation)
+        print("\n{} Round {}: executing {} invocations with a time limit of up to {} seconds.".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round_index + 1, len(round_invocations), max([inv.time_limit for inv in round_invocations])))
+        start_time = time.time()
+        completed = execute_invocations(settings, round_invocations)
+        next_remaining = []
+        for invocation in remaining:
+            identifier = invocation.get_identifier()
+            execution_result = _merge_round_results(settings, invocation, rounds[identifier], start_time)
+            if execution_result is None:
+                continue
+            if execution_result.get("timeout", False) and round_index + 1 < len(time_limits[identifier]):
+                next_remaining.append(invocation)
+            elif journal is not None:
+                journal.record(identifier, execution_result)
+        if not completed:
+            print("\nStopped after round {}. Invocations that are not finished yet will be executed again (starting with the first round).".format(round_index + 1))
+            return
+        print("\n{} Round {} finished: {} of {} invocations timed out and are executed again with a larger time limit.".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round_index + 1, len(next_remaining), len(remaining)))
+        remaining = next_remaining
+        round_index += 1
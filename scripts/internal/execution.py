@@ -1,42 +1,378 @@
 from .utility import *
-import subprocess, threading, time, os, sys
+from .cgroups import *
+import subprocess, threading, time, os, sys, tempfile, io, signal, shutil, errno
 
+try:
+    import resource
+except ImportError:
+    resource = None # not available on all platforms
+
+# The amount of output (in bytes) of each stream that is kept in memory at the beginning and at the end of the output
+OUTPUT_HEAD_TAIL_SIZE = 64 * 1024
+# The interval (in seconds) at which the size of the output is checked
+OUTPUT_SIZE_CHECK_INTERVAL = 1.0
+# The number of bytes that are copied at once
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# The time (in seconds) that the processes of a command get to terminate after SIGTERM before they are killed
+TERMINATION_GRACE_PERIOD = 5.0
+
+STDERR_SEPARATOR = "\n" + "#"*30 + "Output to stderr" + "#"*30 + "\n"
+
+def _get_file_size(file):
+    return os.fstat(file.fileno()).st_size
+
+def _read_head_and_tail(file):
+    """ Reads the beginning and the end of the given file. Output in between is omitted. """
+    size = _get_file_size(file)
+    file.seek(0)
+    if size <= 2 * OUTPUT_HEAD_TAIL_SIZE:
+        return file.read().decode('utf8', errors='replace')
+    head = file.read(OUTPUT_HEAD_TAIL_SIZE).decode('utf8', errors='replace')
+    file.seek(size - OUTPUT_HEAD_TAIL_SIZE)
+    tail = file.read(OUTPUT_HEAD_TAIL_SIZE).decode('utf8', errors='replace')
+    return head + "\n[... {} bytes omitted ...]\n".format(size - 2 * OUTPUT_HEAD_TAIL_SIZE) + tail
+
+def _copy_file(source, destination, max_size):
+    """ Copies (at most max_size bytes of) the source file to the destination file. Returns the number of copied bytes. """
+    source.seek(0)
+    copied = 0
+    while max_size is None or copied < max_size:
+        chunk = source.read(COPY_BUFFER_SIZE if max_size is None else min(COPY_BUFFER_SIZE, max_size - copied))
+        if len(chunk) == 0:
+            break
+        destination.write(chunk)
+        copied += len(chunk)
+    return copied
+
+def set_memory_limit(memory_limit, pid = 0, rlimit_kind = "data"):
+    """
+    Limits the memory (in MB) of the process with the given pid (the current process by default) and all processes spawned from it afterwards.
+    The kind of the limit is either 'data' (RLIMIT_DATA) or 'address-space' (RLIMIT_AS), see Settings.memory_rlimit_kind.
+    Returns false if this is not possible on this platform.
+    """
+    if resource is None or memory_limit is None:
+        return False
+    if pid != 0 and not hasattr(resource, "prlimit"):
+        return False
+    if rlimit_kind == "data" and sys.platform.startswith("linux"):
+        limit_kind = resource.RLIMIT_DATA
+    elif rlimit_kind in ["data", "address-space"]:
+        limit_kind = resource.RLIMIT_AS # RLIMIT_DATA does not cover mmap-ed memory on other platforms
+    else:
+        raise AssertionError("Unknown kind '{}' of memory limit.".format(rlimit_kind))
+    limit_bytes = memory_limit * 1024 * 1024
+    if pid == 0:
+        soft, hard = resource.getrlimit(limit_kind)
+    else:
+        soft, hard = resource.prlimit(pid, limit_kind)
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+    if pid == 0:
+        resource.setrlimit(limit_kind, (limit_bytes, limit_bytes))
+    else:
+        resource.prlimit(pid, limit_kind, (limit_bytes, limit_bytes))
+    return True
+
+# Waits until a line is written to stdin before it replaces itself by the command. In the meantime, the new process is moved into its cgroup and its resources are limited.
+LAUNCHER_SCRIPT = 'read -r line || exit 126; exec "$@"'
+
+def _read_process_group_stats(pgid):
+    """
+    Returns the fields of /proc/<pid>/stat of all (running) processes within the given process group.
+    The fields are given without the pid and the command name, i.e., the first fields are: state, parent pid, process group id, ...
+    """
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join("/proc", entry, "stat"), 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue # the process terminated in the meantime
+        fields = stat[stat.rfind(")") + 1:].split()
+        if len(fields) > 2 and fields[0] != "Z" and int(fields[2]) == pgid:
+            result.append(fields)
+    return result
+
+def _count_process_group_members(pgid):
+    """ Returns the number of (running) processes within the given process group. """
+    if not os.path.isdir("/proc"):
+        # we can only check whether there is at least one process left
+        try:
+            os.killpg(pgid, 0)
+            return 1
+        except OSError:
+            return 0
+    return len(_read_process_group_stats(pgid))
+
+class ProcessGroupSampler(object):
+    """
+    Periodically samples the memory usage (RSS) and the CPU time of all processes within a process group.
+    Each sample is a triple of the elapsed time (in seconds), the total RSS (in MB), and the total CPU time (in seconds).
+    """
+    def __init__(self, pgid, interval):
+        self.pgid = pgid
+        self.interval = interval
+        self.samples = []
+        self.start_time = time.time()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample_until_stopped, daemon=True)
+        self.page_size_mb = os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+        self.clock_ticks = float(os.sysconf("SC_CLK_TCK"))
+
+    def sample(self):
+        stats = _read_process_group_stats(self.pgid)
+        if len(stats) == 0:
+            return
+        # rss is given in pages, the (user, system, and children's user and system) times in clock ticks
+        rss = sum([int(fields[21]) for fields in stats]) * self.page_size_mb
+        cpu_time = sum([int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14]) for fields in stats]) / self.clock_ticks
+        self.samples.append([round(time.time() - self.start_time, 3), round(rss, 1), round(cpu_time, 2)])
+
+    def sample_until_stopped(self):
+        while True:
+            self.sample()
+            if self.stopped.wait(self.interval):
+                break
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
 
 class CommandExecution(object):
-    """ Represents the execution of a single command line argument. """
+    """
+    Represents the execution of a single command line argument.
+    The output of the command is written to temporary (spool) files while the command runs. Only the beginning and the end of the output is kept in memory.
+    The command runs in its own session (and thus process group) so that all processes spawned from it can be terminated at once.
+    """
     def __init__(self):
         self.timeout = None
+        self.output_limit_exceeded = None
+        self.killed = None # true if this process sent SIGKILL to the processes of the command
         self.return_code = None
         self.output = None
         self.wall_time = None
         self.proc = None
+        self.stdout_file = None
+        self.stderr_file = None
+        self.max_output_size = None
+        self.resource_usage = None
+        self.leftover_processes = None
+        self.kill_timer = None
+        self.memory_limit_enforcement = None
+        self.samples = None
+
+    def wait(self, cgroup):
+        """ Waits for the process to terminate and measures the resources used by the process (and its children). """
+        if not hasattr(os, "wait4"):
+            self.proc.wait()
+            return
+        pid, status, rusage = os.wait4(self.proc.pid, 0)
+        self.record_exit(status, rusage, cgroup)
+
+    def record_exit(self, status, rusage, cgroup):
+        """ Stores the return code of the terminated (and reaped) process and the resources used by the process (and its children). """
+        self.proc.returncode = os.waitstatus_to_exitcode(status)
+        self.resource_usage = OrderedDict()
+        # ru_maxrss is given in kilobytes on Linux and in bytes on macOS
+        peak_rss = rusage.ru_maxrss / (1024.0 * 1024.0) if sys.platform == "darwin" else rusage.ru_maxrss / 1024.0
+        user_time, system_time, peak_memory, oom_kills = (None, None, None, None) if cgroup is None else cgroup.get_statistics()
+        self.resource_usage["resource-measurement"] = "rusage" if cgroup is None else "cgroup"
+        self.resource_usage["user-time"] = rusage.ru_utime if user_time is None else user_time
+        self.resource_usage["system-time"] = rusage.ru_stime if system_time is None else system_time
+        self.resource_usage["peak-rss-mb"] = peak_rss
+        if peak_memory is not None:
+            self.resource_usage["cgroup-peak-memory-mb"] = peak_memory
+        if oom_kills is not None:
+            self.resource_usage["oom-killed"] = oom_kills > 0
+        if self.memory_limit_enforcement is not None:
+            self.resource_usage["memory-limit-enforcement"] = self.memory_limit_enforcement
+            if self.memory_limit_enforcement == "cgroup" and oom_kills is not None:
+                # the kernel reports whether the memory limit of the cgroup has been hit
+                self.resource_usage["memout"] = oom_kills > 0
+        self.resource_usage["voluntary-context-switches"] = rusage.ru_nvcsw
+        self.resource_usage["involuntary-context-switches"] = rusage.ru_nivcsw
+
+    def signal_process_group(self, sig):
+        """ Sends the given signal to all processes of the command. """
+        if sig == signal.SIGKILL and self.proc.returncode is None:
+            self.killed = True
+        try:
+            os.killpg(self.proc.pid, sig)
+        except OSError:
+            pass # all processes already terminated
 
     def stop(self):
+        """ Terminates all processes of the command due to a timeout. Processes that are still running after the grace period are killed. """
         self.timeout = True
-        self.proc.kill()
+        self.signal_process_group(signal.SIGTERM)
+        self.kill_timer = threading.Timer(TERMINATION_GRACE_PERIOD, self.signal_process_group, args=(signal.SIGKILL,))
+        self.kill_timer.daemon = True
+        self.kill_timer.start()
+
+    def kill_leftover_processes(self):
+        """
+        Kills the processes of the command that are still running although the command itself terminated and waits until they are gone.
+        After a timeout, the processes first get the grace period to terminate. Returns the number of processes that had to be killed.
+        """
+        deadline = time.time() + (TERMINATION_GRACE_PERIOD if self.timeout else 0.0)
+        leftovers = _count_process_group_members(self.proc.pid)
+        while leftovers > 0 and time.time() < deadline:
+            time.sleep(0.1)
+            leftovers = _count_process_group_members(self.proc.pid)
+        if leftovers > 0:
+            self.signal_process_group(signal.SIGKILL)
+            for i in range(50):
+                if _count_process_group_members(self.proc.pid) == 0:
+                    break
+                time.sleep(0.1)
+        return leftovers
 
-    def run(self, command_line_str, time_limit):
+    def get_output_size(self):
+        return _get_file_size(self.stdout_file) + _get_file_size(self.stderr_file)
+
+    def watch_output_size(self, finished):
+        """ Kills the process as soon as its output exceeds the maximum output size. """
+        while not finished.wait(OUTPUT_SIZE_CHECK_INTERVAL):
+            if self.get_output_size() > self.max_output_size:
+                self.output_limit_exceeded = True
+                self.signal_process_group(signal.SIGKILL)
+                break
+
+    def start(self, command_line_str, spool_dir = None, max_output_size = None, memory_limit = None, setup_fn = None, rlimit_kind = "data"):
+        """
+        Starts the process for the given command line (see run). The given function (if any) is called with the pid of the new process, e.g. to restrict the process to certain cores.
+        The new process first runs a small launcher (see LAUNCHER_SCRIPT) that waits until this (parent) process moved it into its cgroup, called the given function, and limited its memory.
+        Only then, the launcher replaces itself by the command, i.e., the command and all its threads and child processes are restricted right from the start.
+        A preexec_fn is not used since it is not safe in the presence of threads (e.g. the prefetching threads).
+        Returns the cgroup in which the process runs (or None).
+        """
         command_line_str = set_mdpmc_dir(command_line_str)
         command_line_list = command_line_str.split()
         command_line_list[0] = os.path.expanduser(command_line_list[0])
-        self.proc = subprocess.Popen(command_line_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        start_time = time.time()
+        if shutil.which(command_line_list[0]) is None:
+            # the launcher would only report this via its output
+            raise FileNotFoundError(errno.ENOENT, "No such executable file", command_line_list[0])
+        self.close()
+        self.stdout_file = tempfile.TemporaryFile(dir=spool_dir)
+        self.stderr_file = tempfile.TemporaryFile(dir=spool_dir)
+        self.max_output_size = max_output_size
+        self.resource_usage = None
+        self.leftover_processes = None
+        self.kill_timer = None
+        self.samples = None
+        # measure resources within a dedicated cgroup (if possible) to also capture processes that are not waited for
+        cgroup = create_execution_cgroup()
+        cgroup_memory_limit = cgroup is not None and memory_limit is not None and cgroup.set_memory_limit(memory_limit)
+        gate_read, gate_write = os.pipe()
+        try:
+            self.proc = subprocess.Popen(["/bin/sh", "-c", LAUNCHER_SCRIPT, "mdpmc-launcher"] + command_line_list, stdin=gate_read, stdout=self.stdout_file, stderr=self.stderr_file, start_new_session=True)
+        except:
+            os.close(gate_write)
+            if cgroup is not None:
+                cgroup.remove()
+            raise
+        finally:
+            os.close(gate_read)
+        try:
+            with os.fdopen(gate_write, 'wb') as gate:
+                if cgroup is not None and not cgroup.add_process(self.proc.pid):
+                    cgroup.remove()
+                    cgroup, cgroup_memory_limit = None, False
+                self.memory_limit_enforcement = None
+                if setup_fn is not None:
+                    setup_fn(self.proc.pid)
+                if memory_limit is not None:
+                    if cgroup_memory_limit:
+                        self.memory_limit_enforcement = "cgroup"
+                    elif set_memory_limit(memory_limit, self.proc.pid, rlimit_kind):
+                        self.memory_limit_enforcement = "rlimit"
+                gate.write(b"\n")
+        except:
+            # the gate got closed without opening it, i.e., the launcher terminates without starting the command
+            self.proc.wait()
+            if cgroup is not None:
+                cgroup.remove()
+            raise
         self.timeout = False
+        self.output_limit_exceeded = False
+        self.killed = False
         self.output = ""
+        return cgroup
+
+    def read_output(self):
+        """ Reads the beginning and the end of the output of the terminated command. """
+        self.output = self.output + _read_head_and_tail(self.stdout_file)
+        if _get_file_size(self.stderr_file) > 0:
+            self.output = self.output + STDERR_SEPARATOR + _read_head_and_tail(self.stderr_file)
+
+    def run(self, command_line_str, time_limit, spool_dir = None, max_output_size = None, memory_limit = None, sampling_interval = None, rlimit_kind = "data"):
+        """
+        Runs the given command line. The output is written to temporary files within the given directory (or the default directory for temporary files).
+        If the output exceeds the given size (in bytes), the process is killed.
+        The memory (in MB) of the command is limited using the memory controller of its cgroup (if available) or using an rlimit of the given kind (see set_memory_limit).
+        If a sampling interval (in seconds) is given, the memory usage and CPU time of the command are sampled periodically (if /proc is available).
+        """
+        cgroup = self.start(command_line_str, spool_dir, max_output_size, memory_limit, None, rlimit_kind)
+        start_time = time.time()
+        sampler = None
+        if sampling_interval is not None and os.path.isdir("/proc"):
+            sampler = ProcessGroupSampler(self.proc.pid, sampling_interval)
+            sampler.start()
+        timer = None
         if time_limit is not None and time_limit > 0:
             timer = threading.Timer(time_limit, self.stop)
             timer.start()
+        finished = threading.Event()
+        if max_output_size is not None:
+            threading.Thread(target=self.watch_output_size, args=(finished,), daemon=True).start()
         try:
-            stdout, stderr = self.proc.communicate()
+            self.wait(cgroup)
         except Exception as e:
             self.output = self.output + "Error when executing the command:\n{}\n".format(e)
         finally:
-            timer.cancel()
+            if timer is not None:
+                timer.cancel()
+            finished.set()
             self.wall_time = time.time() - start_time
+            if sampler is not None:
+                sampler.stop()
+                self.samples = sampler.samples
+            if self.proc.returncode is None:
+                # waiting failed or got interrupted (e.g. by CTRL+C). The processes are in their own session and thus have to be killed explicitly
+                self.signal_process_group(signal.SIGKILL)
+                self.proc.wait()
             self.return_code = self.proc.returncode
-        self.output = self.output + stdout.decode('utf8')
-        if len(stderr) > 0:
-            self.output = self.output + "\n" + "#"*30 + "Output to stderr" + "#"*30 + "\n" + stderr.decode('utf8')
+            # ensure that no process of this command keeps running during subsequent executions
+            self.leftover_processes = self.kill_leftover_processes()
+            if self.kill_timer is not None:
+                self.kill_timer.cancel()
+            if cgroup is not None:
+                cgroup.remove()
+        self.read_output()
+
+    def write_output(self, logfile):
+        """ Writes the complete output (truncated to the maximum output size) to the given binary file. """
+        remaining_size = self.max_output_size
+        copied = _copy_file(self.stdout_file, logfile, remaining_size)
+        if remaining_size is not None:
+            remaining_size = max(0, remaining_size - copied)
+        if _get_file_size(self.stderr_file) > 0:
+            logfile.write(STDERR_SEPARATOR.encode('utf8'))
+            _copy_file(self.stderr_file, logfile, remaining_size)
+
+    def close(self):
+        """ Removes the temporary files holding the output """
+        for file in [self.stdout_file, self.stderr_file]:
+            if file is not None:
+                file.close()
+        self.stdout_file = None
+        self.stderr_file = None
 
 def execute_command_line(command_line_str : str, time_limit : int, warm_up_run = False):
     """
@@ -44,17 +380,27 @@ def execute_command_line(command_line_str : str, time_limit : int, warm_up_run =
     If warm_up_run is true, a there will be a warm-up execution with a 5 second time limit (whose results will be discarded) before the actual execution.
     :returns the output of the command (including the output to stderr, if present), the runtime of the command and either the return code or None (in case of a timeout)
     """
+    execution = execute_command(command_line_str, time_limit, warm_up_run)
+    execution.close()
+    if execution.timeout:
+        return execution.output, execution.wall_time, None
+    else:
+        return execution.output, execution.wall_time, execution.return_code
+
+def execute_command(command_line_str : str, time_limit : int, warm_up_run = False, spool_dir = None, max_output_size = None, memory_limit = None, sampling_interval = None, rlimit_kind = "data"):
+    """
+    Executes the given command line with the given time limit (in seconds) and memory limit (in MB) and returns the CommandExecution.
+    The caller is responsible for closing the returned CommandExecution.
+    """
     if warm_up_run:
         # do a warm-up run first to hopefully decrease file i/o delay
         dryrun = CommandExecution()
-        dryrun.run(command_line_str, 5)
+        dryrun.run(command_line_str, 5, spool_dir, max_output_size, memory_limit, None, rlimit_kind)
+        dryrun.close()
     # now start the actual run.
     execution = CommandExecution()
-    execution.run(command_line_str, time_limit)
-    if execution.timeout:
-        return execution.output, execution.wall_time, None
-    else:
-        return execution.output, execution.wall_time, execution.return_code
+    execution.run(command_line_str, time_limit, spool_dir, max_output_size, memory_limit, sampling_interval, rlimit_kind)
+    return execution
 
 class Execution(object):
     def __init__(self, invocation):
@@ -62,32 +408,117 @@ class Execution(object):
         self.wall_time = None
         self.logs = None
         self.timeout = None
+        self.output_limit_exceeded = None
         self.error = None
         self.return_codes = None
+        self.resource_usage = None
+        self.leftover_processes = None
+        self.samples = None
+
+    def add_resource_usage(self, resource_usage):
+        """ Accumulates the resource usage of the executed commands. """
+        if resource_usage is None:
+            return
+        if self.resource_usage is None:
+            self.resource_usage = OrderedDict(resource_usage)
+            return
+        for key, value in resource_usage.items():
+            if key not in self.resource_usage:
+                self.resource_usage[key] = value
+            elif key in ["user-time", "system-time", "voluntary-context-switches", "involuntary-context-switches"]:
+                self.resource_usage[key] += value
+            elif key in ["peak-rss-mb", "cgroup-peak-memory-mb"]:
+                self.resource_usage[key] = max(self.resource_usage[key], value)
+            elif key in ["oom-killed", "memout"]:
+                self.resource_usage[key] = self.resource_usage[key] or value
+
+    def run(self, warm_up_run = False, spool_dir = None, max_output_size = None, sampling_interval = None, rlimit_kind = "data"):
+        """
+        Executes the commands of the invocation.
+        The output of the commands is kept in temporary files within the given spool directory until the log is written using write_log.
+        If a sampling interval (in seconds) is given, the memory usage and CPU time of the commands are sampled (see write_samples).
+        Without cgroups, the memory limit of the invocation is enforced using an rlimit of the given kind (see set_memory_limit).
+        """
+        self.reset()
+        for command in self.invocation.commands:
+            command_execution = execute_command(command, self.invocation.time_limit - self.wall_time, warm_up_run, spool_dir, max_output_size, self.invocation.memory_limit, sampling_interval, rlimit_kind)
+            if not self.add_command_execution(command, command_execution, max_output_size):
+                break
 
-    def run(self, warm_up_run = False):
+    def reset(self):
+        """ Discards the results of previous runs. """
+        self.close()
         self.error = False
         self.timeout = False
+        self.output_limit_exceeded = False
         self.wall_time = 0.0
-        self.logs = []
+        self.logs = [] # triples of the text before the output, the CommandExecution holding the output, and the text after the output
         self.return_codes = []
-        for command in self.invocation.commands:
-            log, wall_time, return_code = execute_command_line(command, self.invocation.time_limit - self.wall_time, warm_up_run)
-            self.wall_time = self.wall_time + wall_time
-            self.logs.append("Command:\t{}\nRepitition:\t{}\nWallclock time:\t{}\nReturn code:\t{}\nOutput:\n{}\n".format(command, self.invocation.run_id, wall_time, return_code, log))
-            if return_code is None:
-                self.timeout = True
-                self.error = False
-                self.logs[-1] = self.logs[-1] + "\n" + "-"*10 + "\nComputation aborted after {} seconds since the total time limit of {} seconds was exceeded.\n".format(self.wall_time, self.invocation.time_limit)
-                self.return_codes.append(-9) # process got killed due to timeout
-                break
-            else:
-                self.error = self.error or return_code != 0
-                self.return_codes.append(return_code)
+        self.resource_usage = None
+        self.leftover_processes = 0
+        self.samples = None
 
-    def concatenate_logs(self):
+    def add_command_execution(self, command, command_execution, max_output_size = None):
+        """ Adds the results of the given (finished) execution of a command of the invocation. Returns false if the remaining commands are not to be executed. """
+        wall_time = command_execution.wall_time
+        return_code = None if command_execution.timeout else command_execution.return_code
+        if command_execution.samples is not None:
+            # the samples of subsequent commands continue the time and CPU time of the previous commands
+            if self.samples is None:
+                self.samples = []
+            cpu_time_offset = self.samples[-1][2] if len(self.samples) > 0 else 0.0
+            self.samples += [[round(t + self.wall_time, 3), rss, round(cpu_time + cpu_time_offset, 2)] for t, rss, cpu_time in command_execution.samples]
+        self.wall_time = self.wall_time + wall_time
+        self.add_resource_usage(command_execution.resource_usage)
+        self.leftover_processes += command_execution.leftover_processes
+        self.logs.append(["Command:\t{}\nRepitition:\t{}\nWallclock time:\t{}\nReturn code:\t{}\nOutput:\n".format(command, self.invocation.run_id, wall_time, return_code), command_execution, "\n"])
+        if command_execution.output_limit_exceeded:
+            self.output_limit_exceeded = True
+            self.error = True
+            self.logs[-1][2] += "\n" + "-"*10 + "\nComputation aborted since the output exceeded the maximum log size of {} bytes. The output has been truncated.\n".format(max_output_size)
+            self.return_codes.append(return_code)
+            return False
+        if command_execution.resource_usage is not None and command_execution.resource_usage.get("memout", False):
+            self.error = True
+            self.logs[-1][2] += "\n" + "-"*10 + "\nComputation aborted since the memory limit of {} MB was exceeded.\n".format(self.invocation.memory_limit)
+            self.return_codes.append(return_code)
+            return False
+        if return_code is None:
+            self.timeout = True
+            self.error = False
+            self.logs[-1][2] += "\n" + "-"*10 + "\nComputation aborted after {} seconds since the total time limit of {} seconds was exceeded.\n".format(self.wall_time, self.invocation.time_limit)
+            self.return_codes.append(-9) # process got killed due to timeout
+            return False
+        self.error = self.error or return_code != 0
+        self.return_codes.append(return_code)
+        return True
+
+    def write_log(self, logfile):
+        """ Writes the logs of all commands to the given binary file. """
         hline = "\n" + "#" * 40 + "\n"
-        return hline.join(self.logs)
+        for i, (prefix, command_execution, suffix) in enumerate(self.logs):
+            if i > 0:
+                logfile.write(hline.encode('utf8'))
+            logfile.write(prefix.encode('utf8'))
+            command_execution.write_output(logfile)
+            logfile.write(suffix.encode('utf8'))
+
+    def write_samples(self, samples_file):
+        """ Writes the sampled memory usage and CPU time to the given (text) file, one tab-separated sample per line. """
+        samples_file.write("time\trss-mb\tcpu-time\n")
+        for sample in self.samples:
+            samples_file.write("\t".join([str(value) for value in sample]) + "\n")
+
+    def concatenate_logs(self):
+        log = io.BytesIO()
+        self.write_log(log)
+        return log.getvalue().decode('utf8', errors='replace')
+
+    def close(self):
+        """ Removes the temporary files holding the output of the commands """
+        if self.logs is not None:
+            for prefix, command_execution, suffix in self.logs:
+                command_execution.close()
 
     def to_json(self):
         res = self.invocation.to_json()
@@ -99,4 +530,10 @@ class Execution(object):
             res["execution-error"] = self.error
         if self.return_codes is not None:
             res["return-codes"] = self.return_codes
+        if self.output_limit_exceeded:
+            res["output-limit-exceeded"] = True
+        if self.leftover_processes:
+            res["leftover-processes"] = self.leftover_processes
+        if self.resource_usage is not None:
+            res.update(self.resource_usage)
         return res
\ No newline at end of file
@@ -63,6 +63,16 @@ class CombinedResult(object):
             return None
         return sum(self.runtimes) / len(self.runtimes)
 
+    def runtime_variance(self):
+        """ Returns the sample variance of the considered runtimes (or None if there are less than two runtimes). """
+        if len(self.runtimes) < 2:
+            return None
+        return statistics.variance(self.runtimes)
+
+    def runtime_confidence_interval(self, confidence = 0.95):
+        """ Returns the confidence interval (lower, upper) for the mean of the considered runtimes (or None if there are less than two runtimes). """
+        return get_confidence_interval(self.runtimes, confidence)
+
     def average_walltime(self):
         if len(self.walltimes) == 0:
             return None
@@ -270,6 +280,33 @@ def generate_stats_json(settings, exec_data, benchmark_ids, groups_tools_configs
 def write_line(file, indention, content):
     file.write("\t"*indention + content + "\n")
 
+def load_samples(result_json):
+    """ Loads the samples of the memory usage and CPU time of the given execution. Returns a list of [time, rss, cpu-time] triples. """
+    samples_path = os.path.join(os.path.dirname(result_json["log"]), result_json["samples"])
+    return [[float(value) for value in row] for row in load_csv(samples_path)[1:] if len(row) == 3]
+
+def create_samples_svg(samples, width = 800, height = 200):
+    """ Returns an svg image that plots the memory usage (RSS) and the CPU utilization (number of busy cores) over time. """
+    margin = 40
+    max_time = max(samples[-1][0], 1e-3)
+    max_rss = max(max([s[1] for s in samples]), 1e-3)
+    # CPU utilization between consecutive samples
+    utilization = [[s2[0], (s2[2] - s1[2]) / (s2[0] - s1[0])] for s1, s2 in zip(samples, samples[1:]) if s2[0] > s1[0]]
+    max_utilization = max([1.0] + [u for t, u in utilization])
+    def to_points(values, max_value):
+        return " ".join(["{:.1f},{:.1f}".format(margin + (width - 2 * margin) * t / max_time, height - margin - (height - 2 * margin) * v / max_value) for t, v in values])
+    lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" style="font-size: 12px;">'.format(width, height)]
+    lines.append('<rect x="{}" y="{}" width="{}" height="{}" fill="none" stroke="gray"/>'.format(margin, margin, width - 2 * margin, height - 2 * margin))
+    lines.append('<polyline fill="none" stroke="blue" points="{}"/>'.format(to_points([[s[0], s[1]] for s in samples], max_rss)))
+    if len(utilization) > 0:
+        lines.append('<polyline fill="none" stroke="red" points="{}"/>'.format(to_points(utilization, max_utilization)))
+    lines.append('<text x="{}" y="{}" fill="blue">RSS (max. {:.1f}MB)</text>'.format(margin, margin - 8, max_rss))
+    lines.append('<text x="{}" y="{}" fill="red" text-anchor="end">CPU utilization (max. {:.2f} cores)</text>'.format(width - margin, margin - 8, max_utilization))
+    lines.append('<text x="{}" y="{}">0s</text>'.format(margin, height - margin + 15))
+    lines.append('<text x="{}" y="{}" text-anchor="end">{:.1f}s</text>'.format(width - margin, height - margin + 15, max_time))
+    lines.append('</svg>')
+    return "".join(lines)
+
 # Generates an html log page for the given result within output_dir/logs/
 def create_log_page(settings, result_json_array, group, output_dir):
     combined_res = CombinedResult(result_json_array)
@@ -332,7 +369,7 @@ def create_log_page(settings, result_json_array, group, output_dir):
         walltime_str = ""
         for result_json in result_json_array:
             if result_json["timeout"]:
-                walltime_str += "&gt {}s (Timeout), ".format(result_json["time-limit"])
+                walltime_str += "&gt {}s ({}), ".format(result_json["time-limit"], "Timeout inferred from {}".format(result_json["inferred-from"]) if result_json.get("inferred-timeout", False) else "Timeout")
             else:
                 walltime_str += "{:.3f}s, ".format(result_json["wallclock-time"])
         write_line(f, indention, '<tr><td>Walltime:</td><td style="{}">{}</td></tr>'.format("color: red;" if combined_res.num_timeout > 0 else "tt", walltime_str[:-2]))
@@ -341,7 +378,12 @@ def create_log_page(settings, result_json_array, group, output_dir):
         elif len(combined_res.runtimes) == 1:
             write_line(f, indention, '<tr><td>Considered runtime:</td><td style="tt">{:.3f}s</td></tr>'.format(combined_res.runtimes[0]))
         else:
-            write_line(f, indention, '<tr><td>Considered runtimes:</td><td style="tt">[{}], average={:.3f}s</td></tr>'.format(", ".join(["{:.3f}s".format(r) for r in combined_res.runtimes]), combined_res.average_runtime()))
+            confidence_interval = combined_res.runtime_confidence_interval()
+            write_line(f, indention, '<tr><td>Considered runtimes:</td><td style="tt">[{}], average={:.3f}s, variance={:.3f}s&sup2;, 95% CI=[{:.3f}s, {:.3f}s]</td></tr>'.format(", ".join(["{:.3f}s".format(r) for r in combined_res.runtimes]), combined_res.average_runtime(), combined_res.runtime_variance(), confidence_interval[0], confidence_interval[1]))
+        if all(["user-time" in result_json for result_json in result_json_array]):
+            write_line(f, indention, '<tr><td>CPU time (user/system):</td><td style="tt">{}</td></tr>'.format(", ".join(["{:.3f}s / {:.3f}s".format(r["user-time"], r["system-time"]) for r in result_json_array])))
+        if all(["peak-rss-mb" in result_json for result_json in result_json_array]):
+            write_line(f, indention, '<tr><td>Peak memory (RSS):</td><td style="tt">{}</td></tr>'.format(", ".join(["{:.1f}MB".format(r["peak-rss-mb"]) for r in result_json_array])))
         return_codes = combined_res.return_codes
         if combined_res.num_expected_error + combined_res.num_unexpected_error > 0:
             write_line(f, indention, '<tr><td>Return code(s):</td><td style="tt; color: red;">{}</td></tr>'.format(", ".join([str(rc) for rc in return_codes])))
@@ -359,6 +401,19 @@ def create_log_page(settings, result_json_array, group, output_dir):
         indention -= 1
         write_line(f, indention, "</div>")
 
+        for run_index, result_json in enumerate(result_json_array):
+            if "samples" not in result_json:
+                continue
+            samples = load_samples(result_json)
+            if len(samples) == 0:
+                continue
+            write_line(f, indention, '<div class="box">')
+            indention += 1
+            write_line(f, indention, '<div class="boxlabelo"><div class="boxlabelc">Memory and CPU usage{}</div></div>'.format("" if len(result_json_array) == 1 else " (run {})".format(run_index + 1)))
+            write_line(f, indention, create_samples_svg(samples))
+            indention -= 1
+            write_line(f, indention, "</div>")
+
         for log in logs:
             for filtered_path in settings.filtered_paths():
                 log = log.replace(filtered_path, "")
@@ -1,5 +1,6 @@
 from .utility import *
 from .execution import Execution
+from .prefetch import *
 
 class Invocation(object):
 
@@ -11,29 +12,38 @@ class Invocation(object):
         self.configuration_id = ""
         self.benchmark_id = ""
         self.time_limit = None
+        self.memory_limit = None
         self.run_id = 1
+        self.batch = [] # ids of all benchmarks whose properties are checked by this invocation (empty if only benchmark_id is checked)
         if invocation_json != None:
             self.benchmark_id = invocation_json["benchmark-id"]
             self.configuration_id = invocation_json["configuration-id"]
             self.tool = invocation_json["tool"]
             self.note = invocation_json["invocation-note"]
             self.time_limit = invocation_json["time-limit"]
+            self.memory_limit = invocation_json.get("memory-limit")
             self.run_id = invocation_json["run-id"]
+            self.batch = invocation_json.get("batch", [])
             for c in invocation_json["commands"]:
                 self.add_command(c)
             if len(self.commands) == 0:
                 raise AssertionError("No command defined for the given invocation")
 
-    def get_identifier_no_run_id(self):
+    def get_identifier_no_run_id(self, benchmark_id = None):
+        """ Returns the identifier of this invocation (or of the execution of the given benchmark within this batched invocation). """
         if "." in self.tool: raise AssertionError("Tool name '{}' contains a '.'. This is problematic as we want to infer the tool name from the logfile name.")
         if "." in self.configuration_id: raise AssertionError("Configuration id '{}' contains a '.'. This is problematic as we want to infer the configuration id from the logfile name.")
-        return self.tool + "." + self.configuration_id + "." + self.benchmark_id
+        return self.tool + "." + self.configuration_id + "." + (self.benchmark_id if benchmark_id is None else benchmark_id)
 
 
-    def get_identifier(self):
+    def get_identifier(self, benchmark_id = None):
         if "." in self.tool: raise AssertionError("Tool name '{}' contains a '.'. This is problematic as we want to infer the tool name from the logfile name.")
         if "." in self.configuration_id: raise AssertionError("Configuration id '{}' contains a '.'. This is problematic as we want to infer the configuration id from the logfile name.")
-        return self.get_identifier_no_run_id() + ".run" + str(self.run_id)
+        return self.get_identifier_no_run_id(benchmark_id) + ".run" + str(self.run_id)
+
+    def get_benchmark_ids(self):
+        """ Returns the ids of all benchmarks that are checked by this invocation. """
+        return list(self.batch) if len(self.batch) > 0 else [self.benchmark_id]
         
     def add_command(self, command):
         if not isinstance(command, str):
@@ -41,11 +51,59 @@ class Invocation(object):
         self.commands.append(command)
 
     def to_json(self):
-        return OrderedDict([("benchmark-id", self.benchmark_id), ("tool", self.tool), ("configuration-id", self.configuration_id), ("invocation-note", self.note), ("commands", self.commands), ("time-limit", self.time_limit), ("run-id", self.run_id)])
+        res = OrderedDict([("benchmark-id", self.benchmark_id), ("tool", self.tool), ("configuration-id", self.configuration_id), ("invocation-note", self.note), ("commands", self.commands), ("time-limit", self.time_limit), ("run-id", self.run_id)])
+        if self.memory_limit is not None:
+            res["memory-limit"] = self.memory_limit
+        if len(self.batch) > 0:
+            res["batch"] = self.batch
+        return res
 
-    def execute(self):
+    def execute(self, settings = None, next_invocation = None):
+        """
+        Executes this invocation. If settings are given, the output is spooled within the logs directory and limited to the maximum log size.
+        The file cache is warmed up according to the warm-up strategy of the settings (with a dry run if no settings are given).
+        If the invocation that is executed next is given, its input files are prefetched while this invocation is executed.
+        """
         execution = Execution(self)
-        execution.run(True) # with warm-up run!
+        if settings is None:
+            execution.run(True) # with warm-up run!
+            return execution
+        ensure_directory(settings.logs_dir())
+        strategy = settings.warm_up_strategy()
+        prefetch_invocation(self, strategy)
+        if next_invocation is not None:
+            prefetch_invocation_in_background(next_invocation, strategy)
+        execution.run(strategy == "dry-run", settings.logs_dir(), settings.max_log_size(), settings.sampling_interval(), settings.memory_rlimit_kind())
         return execution
 
-
+def save_execution(settings, invocation, execution):
+    """
+    Stores the log file and the execution results (in json format) within the logs directory. Returns the execution results.
+    For batched invocations, there is one json file for each benchmark of the batch. All of them refer to the same log file. The execution results of the first benchmark are returned.
+    """
+    execution_result = execution.to_json()
+    logfile_name = invocation.get_identifier() + ".log"
+    execution_result["log"] = logfile_name
+    # save logfile
+    with open(os.path.join(settings.logs_dir(), logfile_name), 'wb') as logfile:
+        execution.write_log(logfile)
+    # save the sampled memory usage and CPU time (if any)
+    if execution.samples is not None:
+        samples_filename = invocation.get_identifier() + ".samples"
+        with open(os.path.join(settings.logs_dir(), samples_filename), 'w') as samples_file:
+            execution.write_samples(samples_file)
+        execution_result["samples"] = samples_filename
+    execution.close()
+    # save execution results in json format
+    if len(invocation.batch) == 0:
+        save_json(execution_result, os.path.join(settings.logs_dir(), invocation.get_identifier() + ".json"))
+        return execution_result
+    # The times of the batch are attributed to the individual benchmarks when parsing the log. Each benchmark gets its share of the time limit (see processlogs.attribute_batch_times)
+    execution_result["batch-wallclock-time"] = execution_result.get("wallclock-time")
+    execution_result["batch-time-limit"] = invocation.time_limit
+    execution_result["time-limit"] = invocation.time_limit / len(invocation.batch)
+    for benchmark_id in invocation.batch:
+        benchmark_result = OrderedDict(execution_result)
+        benchmark_result["benchmark-id"] = benchmark_id
+        save_json(benchmark_result, os.path.join(settings.logs_dir(), invocation.get_identifier(benchmark_id) + ".json"))
+    return execution_result
@@ -0,0 +1,49 @@
+from .utility import *
+
+class ExecutionJournal(object):
+    """
+    An append-only journal that records each finished invocation together with its execution results.
+    It allows to resume an interrupted (or crashed) execution of an invocations file without repeating finished work.
+    """
+    def __init__(self, path : str):
+        self.path = path
+        self.entries = OrderedDict() # invocation identifier -> execution result (json)
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line, object_pairs_hook=OrderedDict)
+                    except ValueError:
+                        continue # the last line might be incomplete if the harness crashed while writing it
+                    self.entries[entry["identifier"]] = entry["result"]
+
+    def is_completed(self, identifier : str):
+        return identifier in self.entries
+
+    def get_result(self, identifier : str):
+        return self.entries[identifier]
+
+    def record(self, identifier : str, execution_result):
+        """ Records the given execution result. The entry is flushed to disk immediately so that it survives crashes and reboots. """
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(json.dumps(OrderedDict([("identifier", identifier), ("result", execution_result)]), ensure_ascii=False) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self.entries[identifier] = execution_result
+
+def get_journal(settings):
+    """ Returns the journal associated with the current logs directory. """
+    ensure_directory(settings.logs_dir())
+    return ExecutionJournal(os.path.join(settings.logs_dir(), settings.journal_filename()))
+
+def remove_completed_invocations(settings, journal, invocations):
+    """ Returns the invocations that are not yet completed according to the journal (and whose result files still exist). """
+    remaining = []
+    for invocation in invocations:
+        identifier = invocation.get_identifier()
+        if journal.is_completed(identifier) and os.path.isfile(os.path.join(settings.logs_dir(), identifier + ".json")):
+            continue
+        remaining.append(invocation)
+    if len(remaining) < len(invocations):
+        print("Skipping {} invocations that were already completed according to journal '{}'. Delete this file to execute them again.".format(len(invocations) - len(remaining), journal.path))
+    return remaining
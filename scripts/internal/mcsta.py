@@ -2,6 +2,7 @@ from .benchmark import Benchmark
 from .invocation import Invocation
 from .execution import *
 from .configuration import *
+import re
 
 def get_name():
     """ should return the name of the tool"""
@@ -52,9 +53,10 @@ def is_benchmark_supported(benchmark : Benchmark, configuration : Configuration)
     return benchmark.has_janifile()
 
 
-def get_invocation(settings, benchmark : Benchmark, configuration : Configuration, run_id : int):
+def get_invocation(settings, benchmark : Benchmark, configuration : Configuration, run_id : int, batch = None):
     """
     Returns an invocation that invokes the tool for the given benchmark and the given storm configuration.
+    If a batch of benchmarks is given (which only differ from the given benchmark in their property), the properties of all these benchmarks are checked within the same invocation.
     It can be assumed that the current directory is the directory from which execute_invocations.py is executed.
     """
     general_arguments = "--unsafe -D -S Memory"
@@ -65,6 +67,10 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
     invocation.note = configuration.note
     invocation.benchmark_id = benchmark.get_identifier()
     invocation.run_id = run_id
+    property_names = [benchmark.get_property_name()]
+    if batch is not None:
+        invocation.batch = [b.get_identifier() for b in batch]
+        property_names = [b.get_property_name() for b in batch]
 
     if is_benchmark_supported(benchmark, configuration):
         bdir = benchmark.get_portable_directory()
@@ -72,7 +78,7 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
 
         janifile = benchmark.get_janifilename()
         par_defs = benchmark.get_open_parameter_def_string()
-        benchmark_arguments = "mcsta {} --props {}".format(os.path.join(bdir, janifile), benchmark.get_property_name())
+        benchmark_arguments = "mcsta {} --props {}".format(os.path.join(bdir, janifile), ",".join(property_names))
         if par_defs != "":
             benchmark_arguments += " -E " + par_defs
 
@@ -87,177 +93,245 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
 
 
 
+class LogSection(object):
+    """
+    A section of an mcsta log, i.e., a line '+ <title>' followed by (indented) lines of the form '<key>: <value>'.
+    Nested sections are given by a deeper indentation of their title line.
+    """
+    def __init__(self, title, indentation, body):
+        self.title = title
+        self.indentation = indentation
+        self.body = body
+        self.subsections = []
+        self.fields = None # key -> value (as string), only computed on demand
+
+    def get_fields(self):
+        if self.fields is None:
+            self.fields = OrderedDict()
+            for line in self.body.split("\n"):
+                pos = line.find(":")
+                if pos >= 0:
+                    key = line[:pos].strip()
+                    if key not in self.fields:
+                        self.fields[key] = line[pos + 1:].strip()
+        return self.fields
+
+    def get_text(self):
+        """ Returns the text of this section (without its subsections) """
+        return "{}+ {}\n{}".format(" " * self.indentation, self.title, self.body).strip()
+
+    def get_seconds(self, key):
+        """ Returns the time (in seconds) given by the field with the given key (or None if there is no such time). Note that mcsta rounds times to a multiple of 0.1 s """
+        if key not in self.get_fields():
+            return None
+        value = self.get_fields()[key]
+        end_pos = value.find(" s")
+        if end_pos < 0:
+            return None
+        return float(value[:end_pos])
+
+    def get_int(self, key):
+        if key not in self.get_fields():
+            return None
+        return int(self.get_fields()[key])
+
+    def get_subsection(self, title):
+        for subsection in self.subsections:
+            if subsection.title == title:
+                return subsection
+        return None
+
+# matches the beginning of a line that starts a block of sections
+_SECTION_START = re.compile(r"\n *\+ ")
+# matches the end of a block of sections, i.e., a line that is neither indented nor starts a section
+_SECTION_BLOCK_END = re.compile(r"\n(?=[^ \n+]|\+(?! ))")
+
+class LogInfo(object):
+    """
+    All information that can be extracted from an mcsta log.
+    The log is split into its '+ ...' sections only once, subsequent queries only consider the relevant section.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.sections = [] # top-level sections
+        self.all_sections = [] # all sections (including nested ones) in the order of their occurrence
+        section_start = _SECTION_START.search(log)
+        while section_start is not None:
+            block_end = _SECTION_BLOCK_END.search(log, section_start.end())
+            end_pos = len(log) if block_end is None else block_end.start()
+            block = log[section_start.start() + 1:end_pos]
+            # find the first lines of all sections within the block
+            title_lines = [] # pairs of (start of line, start of '+ ')
+            pos = block.find("+ ")
+            while pos >= 0:
+                line_start = block.rfind("\n", 0, pos) + 1
+                if block[line_start:pos].strip(" ") == "":
+                    title_lines.append((line_start, pos))
+                pos = block.find("+ ", pos + 2)
+            open_sections = [] # the current section and all its parents
+            for i, (line_start, pos) in enumerate(title_lines):
+                title_end = block.find("\n", pos)
+                if title_end < 0:
+                    title_end = len(block)
+                body_end = title_lines[i + 1][0] if i + 1 < len(title_lines) else len(block)
+                section = LogSection(block[pos + 2:title_end].strip(), pos - line_start, block[title_end + 1:body_end])
+                while open_sections and section.indentation <= open_sections[-1].indentation:
+                    open_sections.pop()
+                if open_sections:
+                    open_sections[-1].subsections.append(section)
+                else:
+                    self.sections.append(section)
+                open_sections.append(section)
+                self.all_sections.append(section)
+            section_start = None if block_end is None else _SECTION_START.search(log, end_pos)
+
+        exploration = self.get_section("State space exploration")
+        self.exploration_time = None if exploration is None else exploration.get_seconds("Time (exploration)")
+        self.merging_time = None if exploration is None else exploration.get_seconds("Time (merging)")
+        if self.exploration_time is not None and self.merging_time is not None:
+            self.build_time = self.exploration_time + self.merging_time
+        else:
+            self.build_time = None
+        solver = self.get_section("Value iteration", True)
+        if solver is None:
+            solver = self.get_section("Linear programming", True)
+        self.solve_time = None if solver is None else solver.get_seconds("Time")
+        self.not_supported = any([m in log for m in NOT_SUPPORTED_MESSAGES])
+        self.expected_error = any([m in log for m in EXPECTED_ERROR_MESSAGES])
+        self.memout = any([m in log for m in MEMOUT_MESSAGES])
+
+    def get_section(self, title, title_is_prefix = False):
+        """ Returns the first (possibly nested) section with the given title or None if there is no such section """
+        for section in self.all_sections:
+            if section.title == title or (title_is_prefix and section.title.startswith(title)):
+                return section
+        return None
+
+    def get_property_section(self, property_name):
+        section = self.get_section(property_name)
+        if section is None:
+            section = self.get_section("Property {}".format(property_name))
+        return section
+
+    def get_mc_time(self, property_name):
+        section = self.get_property_section(property_name)
+        return None if section is None else section.get_seconds("Time")
+
+    def get_iterations(self, property_name):
+        section = self.get_property_section(property_name)
+        return None if section is None else section.get_int("WSO instances")
+
+    def get_pareto_time(self, property_name):
+        """ Returns the time spent on approximating the Pareto curve """
+        section = self.get_property_section(property_name)
+        if section is None or section.get_subsection("Pareto Curve Approximation") is None:
+            return None
+        return section.get_subsection("Pareto Curve Approximation").get_seconds("Time")
+
+    def get_approximations(self, property_name):
+        """ Returns the under- and over-approximation of the Pareto curve (as strings) """
+        section = self.get_property_section(property_name)
+        if section is None:
+            return None, None
+        return section.get_fields().get("Under Approximation"), section.get_fields().get("Over Approximation")
+
+    def get_result(self, property_name):
+        """
+        Returns the result for the given property, i.e. the value of its 'Result' field if there is one (e.g. for achievability queries).
+        Otherwise, the text of the property section (including the approximations of the Pareto curve) is returned.
+        """
+        section = self.get_property_section(property_name)
+        if section is None:
+            return None
+        if "Result" in section.get_fields():
+            return section.get_fields()["Result"]
+        return section.get_text()
+
+def parse_log(log):
+    """
+    Parses the given log and returns a LogInfo object
+    """
+    return LogInfo(log)
+
 def get_result(log, benchmark : Benchmark):
     """
     Parses the tool result
     The returned value should be either 'true', 'false', a decimal number, or a fraction.
     """
-
-    pos = log.find("+ {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        pos = log.find("+ Property {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        return None
-    result = log[pos:]
-    # pos = log.find("Bounds:", pos)
-    # if pos < 0:
-    #     return None
-    # pos = log.find("[", pos)
-    # if pos < 0:
-    #     return None
-    # pos += len("[")
-    # end_pos = log.find(",", pos)
-    # if end_pos < 0:
-    #     return None
-    # result = log[pos:end_pos]
-    return result
+    return parse_log(log).get_result(benchmark.get_property_name())
 
 def get_MC_Time(log, benchmark : Benchmark):
     """
     Tries to parse the model checking time (i.e. whatever happens after model building)
     """
-    pos = log.find("+ {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        pos = log.find("+ Property {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        return None
-    pos = log.find("Time:", pos)
-    if pos < 0:
-        return None
-    pos += len("Time:")
-    end_pos = log.find(" s", pos)
-    if end_pos < 0:
-        return None
-    num = log[pos:end_pos] # note that mcsta has rounded this to a multiple of 0.1 s
-    return float(num)
+    return parse_log(log).get_mc_time(benchmark.get_property_name())
 
 
 def get_iterations(log, benchmark : Benchmark):
     """
     Tries to parse the number of iterations
     """
-    pos = log.find("+ {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        pos = log.find("+ Property {}".format(benchmark.get_property_name()))
-    if pos < 0:
-        return None
-    pos = log.find("WSO instances:", pos)
-    if pos < 0:
-        return None
-    pos += len("WSO instances:")
-    end_pos = log.find("\n", pos)
-    if end_pos < 0:
-        return None
-    num = log[pos:end_pos]
-    return int(num)
+    return parse_log(log).get_iterations(benchmark.get_property_name())
 
 def get_Solve_Time(log):
     """
     Tries to parse the solving time of the underlying solution method (model checking time without prob0/1, ... preprocessing)
     """
-    vi = "+ Value iteration"
-    lp = "+ Linear programming"
-    if vi in log:
-        method = vi
-    elif lp in log:
-        method = lp
-    else:
-        return None
-
-    pos = log.find(method)
-    if pos < 0:
-        return None
-    pos = log.find("Time:", pos)
-    if pos < 0:
-        return None
-    pos += len("Time:")
-    end_pos = log.find(" s", pos)
-    if end_pos < 0:
-        return None
-    num = log[pos:end_pos] # note that mcsta has rounded this to a multiple of 0.1 s
-    return float(num)
+    return parse_log(log).solve_time
 
 def get_Build_Time(log):
     """
     Tries to parse the model building time
     """
-    pos = log.find("+ State space exploration")
-    if pos < 0:
-        return None
-
-    pos_expl = log.find("Time (exploration):", pos)
-    if pos_expl < 0:
-        return None
-    pos_expl += len("Time (exploration):")
-    end_pos_expl = log.find(" s", pos_expl)
-    if end_pos_expl < 0:
-        return None
-
-    pos_merge = log.find("Time (merging):", pos)
-    if pos_merge < 0:
-        return None
-    pos_merge += len("Time (merging):")
-    end_pos_merge = log.find(" s", pos_merge)
-    if end_pos_merge < 0:
-        return None
-
-    num_expl = float(log[pos_expl:end_pos_expl]) # note that mcsta has rounded this to a multiple of 0.1 s
-    num_merge = float(log[pos_merge:end_pos_merge]) # note that mcsta has rounded this to a multiple of 0.1 s
-    return num_expl + num_merge
+    return parse_log(log).build_time
+
+# if one of the following error messages occurs, we are sure that the model is not supported.
+NOT_SUPPORTED_MESSAGES = ["error: Open clock constraints are not allowed.",
+                          "Skipping unsupported property",
+                          "Error: Potentially infinite reward",
+                          "Multi-objective properties are only supported for MDPs and LTSs"
+                        ]
+
+# known error messages that are to be expected. This is to detect "weird" errors when processing the logfiles
+EXPECTED_ERROR_MESSAGES = []
+# EXPECTED_ERROR_MESSAGES.append("The linear program is infeasible.")
+# EXPECTED_ERROR_MESSAGES.append("The linear programming solver encountered a numerical failure.")
+# EXPECTED_ERROR_MESSAGES.append("The linear program is unbounded.")
+# EXPECTED_ERROR_MESSAGES.append("The linear programming solver did not find an optimal solution.")
+# EXPECTED_ERROR_MESSAGES.append("The linear program is infeasible or unbounded.")
+# EXPECTED_ERROR_MESSAGES.append("The linear programming solver encountered an accuracy error.")
+# EXPECTED_ERROR_MESSAGES.append("The linear program is degenerative.")
+# EXPECTED_ERROR_MESSAGES.append("Could not load native")
+# EXPECTED_ERROR_MESSAGES.append("Found invalid native")
+# EXPECTED_ERROR_MESSAGES.append("Could not initialise native")
+# EXPECTED_ERROR_MESSAGES.append("Error solving the linear program.")
+# EXPECTED_ERROR_MESSAGES.append("Error while using linear programming")
+# EXPECTED_ERROR_MESSAGES.append("library encountered an error.")
+# EXPECTED_ERROR_MESSAGES.append("The linear programming solver terminated before finding an optimal solution.")
+
+# error messages indicating an out of memory situation
+MEMOUT_MESSAGES = ["The linear programming solver ran out of memory.",
+                   "Out of memory",
+                   "Return code:\t-9",
+                   "System.OutOfMemoryException" # allocation failed due to the memory limit (setrlimit)
+                  ]
 
 def is_not_supported(logfile):
     """
     Returns true if the logfile contains error messages that mean that the input is not supported.
     """
-    # if one of the following error messages occurs, we are sure that the model is not supported.
-    known_messages = ["error: Open clock constraints are not allowed.",
-                      "Skipping unsupported property",
-                      "Error: Potentially infinite reward",
-                      "Multi-objective properties are only supported for MDPs and LTSs"
-                    ]
-
-    for m in known_messages:
-        if m in logfile:
-            return True
-
-    return False
+    return parse_log(logfile).not_supported
 
 
 def is_expected_error(logfile):
     """
     Returns true if the logfile contains a known error message that is to be expected. This is to detect "weird" errors when processing the logfiles
     """
-    known_messages = []
-    # known_messages.append("The linear program is infeasible.")
-    # known_messages.append("The linear programming solver encountered a numerical failure.")
-    # known_messages.append("The linear program is unbounded.")
-    # known_messages.append("The linear programming solver did not find an optimal solution.")
-    # known_messages.append("The linear program is infeasible or unbounded.")
-    # known_messages.append("The linear programming solver encountered an accuracy error.")
-    # known_messages.append("The linear program is degenerative.")
-    # known_messages.append("Could not load native")
-    # known_messages.append("Found invalid native")
-    # known_messages.append("Could not initialise native")
-    # known_messages.append("Error solving the linear program.")
-    # known_messages.append("Error while using linear programming")
-    # known_messages.append("library encountered an error.")
-    # known_messages.append("The linear programming solver terminated before finding an optimal solution.")
-    for m in known_messages:
-        if m in logfile:
-            return True
-    return False
+    return parse_log(logfile).expected_error
 
 def is_memout(logfile):
     """
     Returns true if the logfile indicates an out of memory situation.
     Assumes that a result could not be parsed successfully.
     """
-    known_messages = []
-    known_messages.append("The linear programming solver ran out of memory.")
-    known_messages.append("Out of memory")
-    known_messages.append("Return code:\t-9")
-    for m in known_messages:
-        if m in logfile:
-            return True
-    # if there is no error message and no result is produced, we assume out of memory.
-    return False
+    return parse_log(logfile).memout
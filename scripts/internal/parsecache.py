@@ -0,0 +1,69 @@
+from .utility import *
+import sqlite3
+
+class ParsedLogCache(object):
+    """
+    A persistent cache (stored as an SQLite file within a log directory) for the results of parsing log files.
+    Entries are keyed by the path of the execution json file relative to the log directory (e.g. 'shard-1-of-4/<identifier>.json'), so that equally named files in different shard subdirectories get different entries.
+    Entries are only valid as long as the json file, the log file, and the parser version are unchanged.
+    """
+    def __init__(self, path : str, parser_version : int):
+        self.path = path
+        self.parser_version = parser_version
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS parsed (json_file TEXT PRIMARY KEY, json_mtime INTEGER, json_size INTEGER, log_file TEXT, log_mtime INTEGER, log_size INTEGER, parser_version INTEGER, data TEXT)")
+        self.connection.commit()
+
+    @staticmethod
+    def _get_entry_key(json_filename : str):
+        """ Returns the key of the given json file, i.e., its normalized path relative to the log directory. """
+        if os.path.isabs(json_filename):
+            raise AssertionError("Unable to cache '{}': the path of the json file has to be relative to the log directory.".format(json_filename))
+        return os.path.normpath(json_filename).replace(os.sep, "/")
+
+    @staticmethod
+    def _get_file_key(path : str):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def lookup(self, logdir : str, json_filename : str):
+        """ Returns the cached pair of execution json and tool result for the given file (relative to the given log directory) or None if there is no valid entry. """
+        row = self.connection.execute("SELECT json_mtime, json_size, log_file, log_mtime, log_size, parser_version, data FROM parsed WHERE json_file = ?", (self._get_entry_key(json_filename),)).fetchone()
+        if row is None or row[5] != self.parser_version:
+            return None
+        try:
+            if (row[0], row[1]) != self._get_file_key(os.path.join(logdir, json_filename)) or (row[3], row[4]) != self._get_file_key(os.path.join(logdir, row[2])):
+                return None
+        except OSError:
+            return None
+        execution_json, result = json.loads(row[6], object_pairs_hook=OrderedDict)
+        execution_json["log"] = os.path.join(logdir, row[2])
+        return execution_json, result
+
+    def store(self, logdir : str, json_filename : str, execution_json, result):
+        """ Stores the given execution json and tool result for the given file (relative to the given log directory). """
+        log_file = os.path.relpath(execution_json["log"], logdir)
+        json_key = self._get_file_key(os.path.join(logdir, json_filename))
+        log_key = self._get_file_key(execution_json["log"])
+        self.connection.execute("INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (self._get_entry_key(json_filename), json_key[0], json_key[1], log_file, log_key[0], log_key[1], self.parser_version, json.dumps([execution_json, result], ensure_ascii=False)))
+
+    def remove_other_entries(self, json_filenames):
+        """ Removes all entries that do not belong to one of the given json files (relative to the log directory). """
+        existing = set([self._get_entry_key(name) for name in json_filenames])
+        obsolete = [(name,) for (name,) in self.connection.execute("SELECT json_file FROM parsed") if name not in existing]
+        self.connection.executemany("DELETE FROM parsed WHERE json_file = ?", obsolete)
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+def open_parsed_log_cache(settings, logdir : str, parser_version : int):
+    """ Opens the cache for the given log directory. Returns None if caching is disabled or the cache can not be used (e.g. because the directory is read-only). """
+    if settings.parse_cache_filename() is None:
+        return None
+    path = os.path.join(logdir, settings.parse_cache_filename())
+    try:
+        return ParsedLogCache(path, parser_version)
+    except sqlite3.Error as e:
+        print("Warning: Unable to use cache file '{}' for parsed logs: {}".format(path, e))
+        return None
@@ -0,0 +1,224 @@
+from .utility import *
+from .benchmark import get_benchmark_from_id
+import re
+
+PREDICTOR_VERSION = 3
+
+# Regularization of the regression coefficients. Keeps the linear systems well-conditioned for collinear features (e.g. one-hot encodings)
+RIDGE_LAMBDA = 1e-3
+# Runtimes below this value (in seconds) are treated as this value when taking logarithms
+MIN_RUNTIME = 0.01
+# Lower bound for the standard deviation of the log runtime. Avoids degenerate distributions if all samples are fitted exactly
+MIN_DEVIATION = 1e-3
+# The number of iterations of the EM algorithm that accounts for the (censored) runtimes of timeouts
+CENSORED_ITERATIONS = 20
+
+def get_configuration_parameters(configuration_id : str):
+    """ Returns the precision epsilon and the parameter gamma encoded in the given configuration identifier (e.g. 'ii-abs-e3-g5' yields 10^-3 and 0.5). Missing values are None. """
+    epsilon, gamma = None, None
+    match = re.search(r"-e(\d+)(-|$)", configuration_id)
+    if match is not None:
+        epsilon = 10.0 ** (-int(match.group(1)))
+    match = re.search(r"-g(\d+)(-|$)", configuration_id)
+    if match is not None:
+        gamma = float("0." + match.group(1))
+    return epsilon, gamma
+
+def get_features(benchmark, tool : str, configuration_id : str):
+    """ Returns the features of checking the given benchmark with the given tool configuration (as a dictionary from feature names to numbers). """
+    features = OrderedDict()
+    features["bias"] = 1.0
+    num_states = benchmark.get_max_num_states()
+    if num_states is None or num_states == math.inf:
+        features["states-unknown"] = 1.0
+    else:
+        features["log-states"] = math.log10(num_states + 1)
+    features["objectives"] = float(benchmark.get_num_objectives() if benchmark.is_multi_tradeoff() else 1)
+    features["model-type={}".format(benchmark.get_model_type())] = 1.0
+    features["scatterclass={}".format(benchmark.get_scatterclass())] = 1.0
+    features["tool={}".format(tool)] = 1.0
+    # the algorithm is the prefix of the configuration identifier (e.g. 'topoii' or 'vi')
+    features["algorithm={}.{}".format(tool, configuration_id.split("-")[0])] = 1.0
+    epsilon, gamma = get_configuration_parameters(configuration_id)
+    if epsilon is not None:
+        features["log-precision"] = -math.log10(epsilon)
+    if gamma is not None:
+        features["gamma"] = gamma
+    return features
+
+def _solve(matrix, vector):
+    """ Solves the given (symmetric, positive definite) linear equation system using Gaussian elimination with partial pivoting. """
+    n = len(vector)
+    a = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        if a[col][col] == 0.0:
+            continue
+        for row in range(col + 1, n):
+            factor = a[row][col] / a[col][col]
+            if factor != 0.0:
+                for k in range(col, n + 1):
+                    a[row][k] -= factor * a[col][k]
+    x = [0.0] * n
+    for row in reversed(range(n)):
+        if a[row][row] != 0.0:
+            x[row] = (a[row][n] - sum([a[row][k] * x[k] for k in range(row + 1, n)])) / a[row][row]
+    return x
+
+def _sparse_rows(rows):
+    """ Returns, for each of the given rows, the list of its non-zero entries (index and value). Rows are mostly zero (one-hot encodings). """
+    return [[(i, x) for i, x in enumerate(row) if x != 0.0] for row in rows]
+
+def _gram_matrix(sparse_rows, n : int):
+    """ Returns X^T X + lambda I for the given (sparse) rows of X with n columns. This takes O(N k^2) time for N rows with at most k non-zero entries each. """
+    xtx = [[0.0] * n for i in range(n)]
+    for nonzero in sparse_rows:
+        for i, xi in nonzero:
+            xtx_i = xtx[i]
+            for j, xj in nonzero:
+                xtx_i[j] += xi * xj
+    for i in range(n):
+        xtx[i][i] += RIDGE_LAMBDA
+    return xtx
+
+def _transposed_product(sparse_rows, n : int, targets):
+    """ Returns X^T y for the given (sparse) rows of X with n columns. """
+    xty = [0.0] * n
+    for nonzero, target in zip(sparse_rows, targets):
+        for i, xi in nonzero:
+            xty[i] += xi * target
+    return xty
+
+def _sparse_dot(coefficients, nonzero):
+    return sum([coefficients[i] * x for i, x in nonzero])
+
+def _normal_tail(z):
+    """ Returns the probability that a standard normal random variable exceeds z, i.e., 1 - Phi(z). """
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+def _inverse_mills_ratio(z):
+    """ Returns phi(z) / (1 - Phi(z)), i.e., the expected value of a standard normal random variable that is known to exceed z. """
+    tail = _normal_tail(z)
+    if tail < 1e-300:
+        return z # asymptotically, the expected value approaches z
+    return math.exp(-z * z / 2.0) / math.sqrt(2.0 * math.pi) / tail
+
+class RuntimePredictor(object):
+    """
+    Predicts the runtime of a tool configuration on a benchmark from previous executions.
+    The logarithm of the runtime is normally distributed with a mean that is a linear function of the features (see get_features) and a fixed standard deviation.
+    Timeouts only reveal that the runtime exceeds the time limit, i.e., they are censored samples. The parameters are fitted with the EM algorithm for censored (Tobit) regression.
+    The expected runtime and the timeout probability are both derived from the fitted (log-normal) distribution.
+    Each iteration solves a single linear equation system whose size is the number of features, i.e., training takes a few seconds even for tens of thousands of executions.
+    """
+    def __init__(self, predictor_json = None):
+        self.features = []
+        self.runtime_coefficients = []
+        self.runtime_deviation = 0.0
+        self.num_samples = 0
+        self.num_timeouts = 0
+        if predictor_json is not None:
+            if predictor_json["version"] != PREDICTOR_VERSION:
+                raise AssertionError("Unsupported version {} of runtime predictor (expected version {}).".format(predictor_json["version"], PREDICTOR_VERSION))
+            self.features = predictor_json["features"]
+            self.runtime_coefficients = predictor_json["runtime-coefficients"]
+            self.runtime_deviation = predictor_json["runtime-deviation"]
+            self.num_samples = predictor_json["num-samples"]
+            self.num_timeouts = predictor_json["num-timeouts"]
+
+    def to_json(self):
+        return OrderedDict([("version", PREDICTOR_VERSION), ("num-samples", self.num_samples), ("num-timeouts", self.num_timeouts), ("features", self.features), ("runtime-coefficients", self.runtime_coefficients), ("runtime-deviation", self.runtime_deviation)])
+
+    def _get_row(self, features):
+        return [features.get(name, 0.0) for name in self.features]
+
+    def _get_log_runtime_mean(self, benchmark, tool : str, configuration_id : str):
+        row = self._get_row(get_features(benchmark, tool, configuration_id))
+        return sum([c * x for c, x in zip(self.runtime_coefficients, row)])
+
+    def train(self, samples):
+        """ Fits the predictor to the given samples, each consisting of the features, the runtime in seconds, and whether the execution timed out (in which case the runtime is the time limit). """
+        if len(samples) == 0:
+            raise AssertionError("Unable to train runtime predictor: no executions given.")
+        names = OrderedDict()
+        for features, runtime, timeout in samples:
+            for name in features:
+                names[name] = True
+        self.features = list(names.keys())
+        self.num_samples = len(samples)
+        self.num_timeouts = len([timeout for features, runtime, timeout in samples if timeout])
+        n = len(self.features)
+        rows = _sparse_rows([self._get_row(features) for features, runtime, timeout in samples])
+        log_runtimes = [math.log(max(runtime, MIN_RUNTIME)) for features, runtime, timeout in samples]
+        censored = [timeout for features, runtime, timeout in samples]
+        gram = _gram_matrix(rows, n)
+        # start with the least squares fit that treats timeouts as if they took exactly the time limit
+        targets = list(log_runtimes)
+        variances = [0.0] * len(samples)
+        for iteration in range(CENSORED_ITERATIONS if self.num_timeouts > 0 else 1):
+            self.runtime_coefficients = _solve(gram, _transposed_product(rows, n, targets))
+            means = [_sparse_dot(self.runtime_coefficients, row) for row in rows]
+            self.runtime_deviation = max(math.sqrt(sum([(y - m) ** 2 + v for y, m, v in zip(targets, means, variances)]) / len(samples)), MIN_DEVIATION)
+            if self.num_timeouts == 0:
+                break
+            # E-step: the expected value (and variance) of the log runtime of timeouts given that it exceeds the (log) time limit
+            for index in range(len(samples)):
+                if censored[index]:
+                    z = (log_runtimes[index] - means[index]) / self.runtime_deviation
+                    mills = _inverse_mills_ratio(z)
+                    targets[index] = means[index] + self.runtime_deviation * mills
+                    variances[index] = self.runtime_deviation ** 2 * max(1.0 + z * mills - mills * mills, 0.0)
+
+    def predict(self, benchmark, tool : str, configuration_id : str):
+        """ Returns the expected runtime (in seconds) of checking the given benchmark with the given tool configuration. """
+        # the mean of the log-normal distribution
+        return math.exp(min(self._get_log_runtime_mean(benchmark, tool, configuration_id) + self.runtime_deviation ** 2 / 2.0, 50.0))
+
+    def predict_timeout_probability(self, benchmark, tool : str, configuration_id : str, time_limit):
+        """ Returns the probability that checking the given benchmark with the given tool configuration takes longer than the given time limit (in seconds). """
+        z = (math.log(max(float(time_limit), MIN_RUNTIME)) - self._get_log_runtime_mean(benchmark, tool, configuration_id)) / self.runtime_deviation
+        return _normal_tail(z)
+
+    def predict_invocation(self, settings, invocation):
+        """ Returns the expected runtime (at most the time limit) of the given invocation. """
+        expected_runtime = sum([self.predict(get_benchmark_from_id(settings, benchmark_id), invocation.tool, invocation.configuration_id) for benchmark_id in invocation.get_benchmark_ids()])
+        if invocation.time_limit is not None:
+            expected_runtime = min(expected_runtime, float(invocation.time_limit))
+        return expected_runtime
+
+def get_training_samples(settings, exec_data):
+    """ Returns the training samples (features, runtime, timeout) of the executions gathered by gather_execution_data. The runtime of timeouts is the time limit. Unsupported and failed executions are skipped. """
+    samples = []
+    for group in exec_data:
+        for tool in exec_data[group]:
+            for config in exec_data[group][tool]:
+                for benchmark_id in exec_data[group][tool][config]:
+                    benchmark = get_benchmark_from_id(settings, benchmark_id)
+                    features = get_features(benchmark, tool, config)
+                    for execution_json in exec_data[group][tool][config][benchmark_id]:
+                        if "wallclock-time" not in execution_json or not execution_json.get("supported", True) or execution_json.get("execution-error", False):
+                            continue
+                        if execution_json.get("memout", False) or execution_json.get("expected-error", False) or execution_json.get("inferred-timeout", False):
+                            continue
+                        if execution_json.get("timeout", False):
+                            samples.append((features, execution_json["time-limit"], True))
+                        else:
+                            samples.append((features, execution_json["wallclock-time"], False))
+    return samples
+
+def train_predictor(settings, exec_data):
+    """ Trains a runtime predictor on the executions gathered by gather_execution_data. """
+    predictor = RuntimePredictor()
+    predictor.train(get_training_samples(settings, exec_data))
+    return predictor
+
+def save_predictor(predictor, path : str):
+    save_json(predictor.to_json(), path)
+
+def load_predictor(settings):
+    """ Loads the runtime predictor from the file given in the settings or returns None if there is no such file. """
+    path = settings.predictor_filename()
+    if path is None or not os.path.isfile(path):
+        return None
+    return RuntimePredictor(load_json(path))
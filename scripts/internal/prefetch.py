@@ -0,0 +1,56 @@
+from .utility import *
+import threading
+
+# The strategies to warm up the file cache before a measured execution
+WARM_UP_STRATEGIES = ["none", "binary", "prefetch", "dry-run"]
+
+# The number of bytes that are read at once when prefetching without posix_fadvise
+PREFETCH_BUFFER_SIZE = 1024 * 1024
+
+def get_command_files(command_line_str : str, binary_only = False):
+    """ Returns the (existing) files that are accessed by the given command line, i.e., the binary and all arguments that are paths of files. """
+    arguments = set_mdpmc_dir(command_line_str).split()
+    if len(arguments) == 0:
+        return []
+    arguments[0] = os.path.expanduser(arguments[0])
+    if binary_only:
+        arguments = arguments[:1]
+    return [a for a in arguments if os.path.isfile(a)]
+
+def get_invocation_files(invocation, binary_only = False):
+    """ Returns the files accessed by the commands of the given invocation (without duplicates). """
+    files = OrderedDict()
+    for command in invocation.commands:
+        for path in get_command_files(command, binary_only):
+            files[path] = True
+    return list(files.keys())
+
+def prefetch_file(path : str, wait = True):
+    """
+    Loads the given file into the file cache.
+    If wait is false, the kernel is only advised to read the file (using posix_fadvise) and the function returns immediately.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                if not wait:
+                    return
+            # read the file to make sure that it is cached (this is cheap if it already is)
+            while len(f.read(PREFETCH_BUFFER_SIZE)) > 0:
+                pass
+    except OSError:
+        pass # prefetching is only an optimization
+
+def prefetch_invocation(invocation, strategy : str, wait = True):
+    """ Warms up the file cache for the given invocation according to the given strategy ('binary' or 'prefetch'). Other strategies are ignored. """
+    if strategy not in ["binary", "prefetch"]:
+        return
+    for path in get_invocation_files(invocation, strategy == "binary"):
+        prefetch_file(path, wait)
+
+def prefetch_invocation_in_background(invocation, strategy : str):
+    """ Starts warming up the file cache for the given invocation (e.g. the next one) while other invocations are executed. """
+    if strategy not in ["binary", "prefetch"]:
+        return
+    threading.Thread(target=prefetch_invocation, args=(invocation, strategy, False), daemon=True).start()
@@ -2,8 +2,10 @@ from .benchmark import *
 from .utility import *
 from . import storm
 from . import  mcsta
+from .parsecache import *
 import sys
 import os
+import multiprocessing
 
 def process_tool_result(result, notes, settings, benchmark, execution_json):
     if result is not None:
@@ -11,11 +13,12 @@ def process_tool_result(result, notes, settings, benchmark, execution_json):
         result = try_to_bool_or_number(result)
         if result is not None and "exact" in execution_json["configuration-id"]:
             benchmark.store_reference_result(str(result), "{}.{}".format(execution_json["tool"],execution_json["configuration-id"]))
-        if benchmark.has_reference_result():
-            execution_json["result-correct"] = is_result_correct(settings, benchmark.get_reference_result(), result)
-            if is_number(result) and is_number_or_interval(benchmark.get_reference_result()):
-                execution_json["absolute-error"] = try_to_float(get_absolute_error(benchmark.get_reference_result(), result))
-                execution_json["relative-error"] = try_to_float(get_relative_error(benchmark.get_reference_result(), result))
+        reference_result = benchmark.get_reference_result()
+        if reference_result is not None:
+            execution_json["result-correct"] = is_result_correct(settings, reference_result, result)
+            if is_number(result) and is_number_or_interval(reference_result):
+                execution_json["absolute-error"] = try_to_float(get_absolute_error(reference_result, result))
+                execution_json["relative-error"] = try_to_float(get_relative_error(reference_result, result))
                 if not execution_json["result-correct"]:
                     # Prepare a message
                     if settings.is_relative_precision():
@@ -28,15 +31,15 @@ def process_tool_result(result, notes, settings, benchmark, execution_json):
                         execution_result_str = "'{}' (approx. {})".format(result, try_to_float(result))
                     else:
                         execution_result_str = "'{}'".format(result)
-                    if is_number(benchmark.get_reference_result()) and not (isinstance(benchmark.get_reference_result(), float) or isinstance(benchmark.get_reference_result(), int)):
-                        ref_result_str = "'{}' (approx. {})".format(benchmark.get_reference_result(), try_to_float(benchmark.get_reference_result()))
-                    elif (isinstance(benchmark.get_reference_result(), dict) or isinstance(benchmark.get_reference_result(), OrderedDict)) and "lower" in benchmark.get_reference_result() and "upper" in benchmark.get_reference_result():
-                        ref_result_str = "[{},{}]".format(try_to_float(benchmark.get_reference_result()["lower"]), try_to_float(benchmark.get_reference_result()["upper"]))
+                    if is_number(reference_result) and not (isinstance(reference_result, float) or isinstance(reference_result, int)):
+                        ref_result_str = "'{}' (approx. {})".format(reference_result, try_to_float(reference_result))
+                    elif (isinstance(reference_result, dict) or isinstance(reference_result, OrderedDict)) and "lower" in reference_result and "upper" in reference_result:
+                        ref_result_str = "[{},{}]".format(try_to_float(reference_result["lower"]), try_to_float(reference_result["upper"]))
                     else:
-                        ref_result_str = "'{}'".format(benchmark.get_reference_result())
+                        ref_result_str = "'{}'".format(reference_result)
                     notes.append("The tool result {} is tagged as incorrect. The reference result is {} which means {} error of '{}' which is larger than the goal precision '{}'.".format(execution_result_str, ref_result_str, error_kind, error_value, try_to_float(settings.goal_precision())))
             elif not execution_json["result-correct"]:
-                notes.append("Result '{}' is tagged as incorrect because it is different from the reference result '{}'.".format(result, benchmark.get_reference_result()))
+                notes.append("Result '{}' is tagged as incorrect because it is different from the reference result '{}'.".format(result, reference_result))
         else:
             pass
             # notes.append("Correctness of result is not checked because no reference result is available.")
@@ -47,63 +50,123 @@ def process_tool_result(result, notes, settings, benchmark, execution_json):
             notes.append("Unable to obtain tool result.")
             execution_json["execution-error"] = True
 
-def parse_tool_output(settings, execution_json):
-    with open(execution_json["log"], 'r') as logfile:
-        log = logfile.read()
+# Increase this whenever parse_tool_log (or one of the tool log parsers) changes its output. Invalidates all cached parse results.
+LOG_PARSER_VERSION = 4
 
+def attribute_batch_times(settings, execution_json, tool_log):
+    """
+    Attributes the time of an execution that checked the properties of several (n) benchmarks (a batch) to the benchmark of the given execution json.
+    The time shared by all properties (starting the tool, parsing and building the model) is split evenly, i.e., each benchmark is charged with 1/n of the shared time and the model checking time of its own property.
+    The time spent on properties that have not been checked (completely) is split evenly among them. Hence, the times attributed to the benchmarks sum up to the time of the batch.
+    If all properties have been checked, the shared time is the part of the batch time that is not spent on model checking. Otherwise, the model building and preprocessing times of the log are used.
+    Consistently, the time limit of each benchmark is 1/n of the time limit of the batch (see save_execution). A checked property is considered as timed out if and only if its attributed time exceeds this limit.
+    """
+    mc_times = []
+    for benchmark_id in execution_json["batch"]:
+        mc_time = tool_log.get_mc_time(get_benchmark_from_id(settings, benchmark_id).get_property_name())
+        mc_times.append(None if mc_time is None else float(mc_time))
+    batch_size = len(mc_times)
+    batch_time = execution_json["batch-wallclock-time"]
+    checked_mc_time = sum([t for t in mc_times if t is not None])
+    if None not in mc_times:
+        shared_time = max(0.0, batch_time - checked_mc_time)
+    else:
+        shared_time = min(sum([float(execution_json.get(key, 0.0)) for key in ["model-building-time", "preprocessing-time"]]), max(0.0, batch_time - checked_mc_time))
+    execution_json["batch-shared-time"] = shared_time
+    execution_json["batch-time-attribution"] = "1/{} of the shared time plus the model checking time of the property; the time limit is 1/{} of the time limit of the batch".format(batch_size, batch_size)
+    if "model-checking-time" not in execution_json:
+        # The property has not been checked (completely): it gets its share of the time that is not attributed to the checked properties. The timeout of the batch is kept
+        num_unchecked = len([t for t in mc_times if t is None])
+        execution_json["wallclock-time"] = shared_time / batch_size + max(0.0, batch_time - shared_time - checked_mc_time) / num_unchecked
+        return
+    execution_json["wallclock-time"] = shared_time / batch_size + float(execution_json["model-checking-time"])
+    execution_json["timeout"] = execution_json["wallclock-time"] > execution_json["time-limit"]
+
+def parse_tool_log(settings, execution_json, log):
+    """
+    Extracts the tool-specific information (times, iterations, ...) from the given log and stores it in execution_json.
+    Returns the tool result or None if there is none.
+    This does not depend on reference results and can thus be executed in worker processes.
+    """
+    if execution_json.get("inferred-timeout", False):
+        # the invocation has been skipped (see pruning.py), i.e., there is no tool output
+        execution_json["supported"] = True
+        return None
     benchmark = get_benchmark_from_id(settings, execution_json["benchmark-id"])
-    
-    notes = []
+    # the properties of several benchmarks might have been checked in the same invocation
+    is_batch = len(execution_json.get("batch", [])) > 1
+    # memouts are detected by the kernel if the memory limit has been enforced using cgroups
+    measured_memout = execution_json.get("memout") if execution_json.get("memory-limit-enforcement") == "cgroup" else None
+
+    result = None
     if execution_json["tool"] == storm.get_name():
-        execution_json["supported"] = not storm.is_not_supported(log)
-        build_time = storm.get_Build_Time(log)
-        if build_time is not None: execution_json["model-building-time"] = build_time
-        nontriv_mec = storm.get_nontriv_mec_percentage(log)
-        if nontriv_mec is not None: execution_json["nontrivial-mec-percentage"] = nontriv_mec
-        preprocessing_time = storm.get_preprocessing_time(log)
-        if preprocessing_time is not None: execution_json["preprocessing-time"] = preprocessing_time
-        execution_json["bisimulation"] = storm.is_bisimulation_used(log)
-        result = None
-        mctime = storm.get_MC_Time(log)
-        if mctime is not None:
-            execution_json["model-checking-time"] = mctime
-            result = storm.get_result(log, benchmark)
-            iters = storm.get_iterations(log)
-            if iters is not None: execution_json["iterations"] = iters
-            solve_time = storm.get_Solve_Time(log)
+        storm_log = storm.parse_log(log)
+        execution_json["supported"] = not storm_log.not_supported
+        if storm_log.build_time is not None: execution_json["model-building-time"] = storm_log.build_time
+        if storm_log.nontriv_mec_percentage is not None: execution_json["nontrivial-mec-percentage"] = storm_log.nontriv_mec_percentage
+        if storm_log.preprocessing_time is not None: execution_json["preprocessing-time"] = storm_log.preprocessing_time
+        execution_json["bisimulation"] = storm_log.bisimulation
+        if is_batch:
+            mc_time = storm_log.get_mc_time(benchmark.get_property_name())
+            iterations = storm_log.get_iterations(benchmark.get_property_name())
+            solve_time = None # not available for the individual properties
+        else:
+            mc_time, iterations, solve_time = storm_log.mc_time, storm_log.iterations, storm_log.solve_time
+        if mc_time is not None:
+            execution_json["model-checking-time"] = mc_time
+            result = storm_log.get_result(benchmark.get_property_name())
+            if iterations is not None: execution_json["iterations"] = iterations
             if solve_time is not None: execution_json["model-solving-time"] = solve_time
 
             execution_json["memout"] = False
             execution_json["expected-error"] = False
         else:
-            execution_json["memout"] = storm.is_memout(log)
-            execution_json["expected-error"] = storm.is_expected_error(log)
+            execution_json["memout"] = storm_log.memout
+            execution_json["expected-error"] = storm_log.expected_error
+        if is_batch:
+            attribute_batch_times(settings, execution_json, storm_log)
     elif execution_json["tool"] == "mcsta":
-        execution_json["supported"] = not mcsta.is_not_supported(log)
-        build_time = mcsta.get_Build_Time(log)
-        if build_time is not None: execution_json["model-building-time"] = build_time
-        result = None
-        mctime = mcsta.get_MC_Time(log, benchmark)
+        mcsta_log = mcsta.parse_log(log)
+        execution_json["supported"] = not mcsta_log.not_supported
+        if mcsta_log.build_time is not None: execution_json["model-building-time"] = mcsta_log.build_time
+        mctime = mcsta_log.get_mc_time(benchmark.get_property_name())
         if mctime is not None:
             if True: # old: float(mctime) <= 1800
                 execution_json["model-checking-time"] = mctime
-                result = mcsta.get_result(log, benchmark)
-                iters = mcsta.get_iterations(log, benchmark)
+                result = mcsta_log.get_result(benchmark.get_property_name())
+                iters = mcsta_log.get_iterations(benchmark.get_property_name())
                 if iters is not None: execution_json["iterations"] = iters
-                solve_time = mcsta.get_Solve_Time(log)
-                if solve_time is not None: execution_json["model-solving-time"] = solve_time
+                if mcsta_log.solve_time is not None and not is_batch: execution_json["model-solving-time"] = mcsta_log.solve_time
             else:
                 execution_json["timeout"] = True
             execution_json["memout"] = False
             execution_json["expected-error"] = False
         else:
-            execution_json["memout"] = mcsta.is_memout(log)
-            execution_json["expected-error"] = mcsta.is_expected_error(log)
+            execution_json["memout"] = mcsta_log.memout
+            execution_json["expected-error"] = mcsta_log.expected_error
+        if is_batch:
+            attribute_batch_times(settings, execution_json, mcsta_log)
     else:
         print("Error: Unknown tool '{}'".format(execution_json["tool"]))
-    
+    if measured_memout is not None:
+        execution_json["memout"] = measured_memout
+    elif execution_json.get("oom-killed", False):
+        # measured (rather than guessed from the log)
+        execution_json["memout"] = True
+    return result
+
+def process_parsed_tool_output(settings, execution_json, result):
+    """ Checks the result obtained from parse_tool_log against the reference result and adds notes to execution_json. """
+    benchmark = get_benchmark_from_id(settings, execution_json["benchmark-id"])
+    notes = []
     process_tool_result(result, notes, settings, benchmark, execution_json)
-    execution_json["notes"] = notes    
+    execution_json["notes"] = notes
+
+def parse_tool_output(settings, execution_json):
+    with open(execution_json["log"], 'r') as logfile:
+        log = logfile.read()
+    result = parse_tool_log(settings, execution_json, log)
+    process_parsed_tool_output(settings, execution_json, result)
 
 def get_group_name_from_logdir(logdir):
     if os.path.basename(logdir) == "":
@@ -118,30 +181,81 @@ def get_all_groups_tools_configs(logdirs):
         raise AssertionError("log file directory names must be unique. Got {}".format(group_names))
     return [(group, t, c) for group in group_names for t,c in tc]
 
+# Fewer logs are parsed sequentially since starting the worker processes would take longer than parsing them
+MIN_PARALLEL_PARSE_TASKS = 256
+
+_worker_settings = None
+
+def _init_parse_worker(settings):
+    global _worker_settings
+    _worker_settings = settings
+
+def _load_and_parse_execution(task):
+    """ Loads the execution json file and parses the corresponding log. Returns the execution json and the tool result. """
+    logdir, json_filename = task
+    execution_json = load_json(os.path.join(logdir, json_filename))
+    # the log file is located next to the json file (which might be in the subdirectory of a shard)
+    execution_json["log"] = os.path.join(logdir, os.path.dirname(json_filename), execution_json["log"])
+    with open(execution_json["log"], 'r') as logfile:
+        log = logfile.read()
+    return execution_json, parse_tool_log(_worker_settings, execution_json, log)
+
 def gather_execution_data(settings, logdirs, groups_tools_configs):
     exec_data = OrderedDict() # Group -> Tool -> Config -> Benchmark -> [Data Array]
     for g,t,c in groups_tools_configs:
         if g not in exec_data: exec_data[g] = OrderedDict()
         if t not in exec_data[g]: exec_data[g][t] = OrderedDict()
         exec_data[g][t][c] = OrderedDict()
-    for logdir_input in logdirs:
-        logdir = os.path.expanduser(logdir_input)
-        assert os.path.isdir(logdir), f"Error: directory '{logdir}' does not exist."
-        group = get_group_name_from_logdir(logdir)
-        print("\nGathering execution data for logfiles in group '{}' directory: {} ...".format(group, logdir))
-        json_files = [ f for f in os.listdir(logdir) if f.endswith(".json") and os.path.isfile(os.path.join(logdir, f)) ]
-        progress = Progressbar(len(json_files))   
-        i = 0
-        for execution_json in [ load_json(os.path.join(logdir, f)) for f in json_files ]:
-            progress.print_progress(i)
-            i += 1
-            tool = execution_json["tool"]
-            config = execution_json["configuration-id"]
-            benchmark = execution_json["benchmark-id"]
-            if benchmark not in exec_data[group][tool][config]:
-                exec_data[group][tool][config][benchmark] = []
-            execution_json["log"] = os.path.join(logdir, execution_json["log"])
-            parse_tool_output(settings, execution_json)
-            exec_data[group][tool][config][benchmark].append(execution_json)
+    num_workers = settings.postprocessing_workers()
+    pool = None # started as soon as there are enough logs to parse
+    _init_parse_worker(settings)
+    try:
+        for logdir_input in logdirs:
+            logdir = os.path.expanduser(logdir_input)
+            assert os.path.isdir(logdir), f"Error: directory '{logdir}' does not exist."
+            group = get_group_name_from_logdir(logdir)
+            json_files = get_execution_json_files(logdir)
+            # only logs that are new or changed since the last run need to be parsed
+            cache = open_parsed_log_cache(settings, logdir, LOG_PARSER_VERSION)
+            cached_executions = [None if cache is None else cache.lookup(logdir, f) for f in json_files]
+            tasks = [(logdir, f) for f, cached in zip(json_files, cached_executions) if cached is None]
+            parallel = num_workers > 1 and len(tasks) >= MIN_PARALLEL_PARSE_TASKS
+            if parallel and pool is None:
+                get_benchmark_registry(settings) # build the registry before forking so that all workers share it
+                pool = multiprocessing.get_context("fork").Pool(num_workers, initializer=_init_parse_worker, initargs=(settings,))
+            print("\nGathering execution data for logfiles in group '{}' directory: {} {}...".format(group, logdir, "using {} processes ".format(num_workers) if parallel else ""))
+            if cache is not None:
+                print("Found {} of {} executions in cache '{}'.".format(len(json_files) - len(tasks), len(json_files), cache.path))
+            progress = Progressbar(len(json_files))
+            # logs are parsed in parallel, results are processed in the original order
+            if not parallel:
+                parsed_executions = map(_load_and_parse_execution, tasks)
+            else:
+                parsed_executions = pool.imap(_load_and_parse_execution, tasks, chunksize=settings.postprocessing_chunk_size())
+            try:
+                for i, (json_filename, cached) in enumerate(zip(json_files, cached_executions)):
+                    progress.print_progress(i)
+                    if cached is None:
+                        execution_json, result = next(parsed_executions)
+                        if cache is not None:
+                            cache.store(logdir, json_filename, execution_json, result)
+                    else:
+                        execution_json, result = cached
+                    tool = execution_json["tool"]
+                    config = execution_json["configuration-id"]
+                    benchmark = execution_json["benchmark-id"]
+                    if benchmark not in exec_data[group][tool][config]:
+                        exec_data[group][tool][config][benchmark] = []
+                    process_parsed_tool_output(settings, execution_json, result)
+                    exec_data[group][tool][config][benchmark].append(execution_json)
+                if cache is not None:
+                    cache.remove_other_entries(json_files)
+            finally:
+                if cache is not None:
+                    cache.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+    get_reference_result_store().flush()
     print("\n")
     return exec_data
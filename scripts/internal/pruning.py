@@ -0,0 +1,145 @@
+from .utility import *
+from .invocation import *
+from .resultcache import *
+from . import storm
+from . import mcsta
+import re
+
+# Return codes of commands that got killed (by SIGKILL). If the benchmarking scripts did not kill the command (e.g. due to the time limit), it has been killed by the OOM killer of the kernel
+MEMOUT_RETURN_CODES = [-9, 137]
+
+# Matches the precision part of a configuration identifier, e.g. '-e3' in 'topoii-abs-e3-g5' (i.e. epsilon=10^-3)
+# Only epsilon defines sweeps: a smaller epsilon is strictly harder, whereas gamma (e.g. '-g5') is a parameter of the algorithm that does not order the configurations by difficulty
+PRECISION_PATTERN = re.compile(r"-e(\d+)(?=-|$)")
+
+def get_precision_sweep(configuration_id : str):
+    """
+    Returns the precision sweep of the given configuration, i.e., its identifier without the precision (e.g. 'topoii-abs-e*-g5'), and the exponent of its precision (e.g. 3).
+    Returns None if the identifier does not encode a precision.
+    """
+    match = PRECISION_PATTERN.search(configuration_id)
+    if match is None:
+        return None
+    return configuration_id[:match.start()] + "-e*" + configuration_id[match.end():], int(match.group(1))
+
+def get_coarser_configuration_ids(configuration_id : str):
+    """ Returns the identifiers of the configurations of the same precision sweep with a coarser precision (i.e. a larger epsilon), coarsest first. """
+    sweep = get_precision_sweep(configuration_id)
+    if sweep is None:
+        return []
+    sweep_id, exponent = sweep
+    return [sweep_id.replace("-e*", "-e{}".format(e)) for e in range(exponent)]
+
+def get_sweep_key(invocation):
+    """ Returns the key of the precision sweep (tool, configuration without precision, benchmark, run) of the given invocation or None if it does not belong to a sweep. Batched invocations never belong to a sweep. """
+    sweep = get_precision_sweep(invocation.configuration_id)
+    if sweep is None or len(invocation.batch) > 0:
+        return None
+    return (invocation.tool, sweep[0], invocation.benchmark_id, invocation.run_id)
+
+def order_precision_sweeps(invocations):
+    """
+    Orders the invocations of each precision sweep (same tool, benchmark, run, and configuration except for the precision) from coarse to fine precision.
+    The invocations of a sweep take the positions of the sweep within the given list, i.e., all other invocations keep their position.
+    """
+    sweeps = OrderedDict() # sweep -> positions within the list
+    for index, invocation in enumerate(invocations):
+        key = get_sweep_key(invocation)
+        if key is None:
+            continue
+        if key not in sweeps:
+            sweeps[key] = []
+        sweeps[key].append(index)
+    result = list(invocations)
+    for positions in sweeps.values():
+        ordered = sorted(positions, key=lambda i: get_precision_sweep(invocations[i].configuration_id)[1])
+        for position, index in zip(positions, ordered):
+            result[position] = invocations[index]
+    return result
+
+def is_failed_execution(execution_json):
+    """ Returns true if the given execution ran into the time or memory limit. """
+    return execution_json.get("timeout", False) or execution_json.get("memout", False) or execution_json.get("oom-killed", False)
+
+def detect_memout(execution):
+    """
+    Marks the given (finished) execution as memout if the memory limit has not been enforced by the kernel (see cgroups.py) but the kernel or the output of the tool indicate that the tool ran out of memory.
+    Otherwise, such memouts would only be detected when parsing the logs, i.e., too late for get_dominating_failure.
+    A command that got killed only counts as memout if it has not been killed by the benchmarking scripts (e.g. due to the time or output limit) and, if its cgroup reports OOM kills, the OOM killer was involved.
+    """
+    if execution.timeout or execution.output_limit_exceeded or (execution.resource_usage is not None and "memout" in execution.resource_usage):
+        return
+    if execution.invocation.tool == storm.get_name():
+        messages = storm.MEMOUT_MESSAGES
+    elif execution.invocation.tool == mcsta.get_name():
+        messages = mcsta.MEMOUT_MESSAGES
+    else:
+        messages = []
+    if execution.resource_usage is not None and "oom-killed" in execution.resource_usage:
+        killed = execution.resource_usage["oom-killed"]
+    else:
+        killed = any([command_execution.return_code in MEMOUT_RETURN_CODES and not command_execution.killed for prefix, command_execution, suffix in execution.logs])
+    # the messages are printed at the end of the output, which is always kept in memory
+    if killed or any([m in command_execution.output for prefix, command_execution, suffix in execution.logs for m in messages]):
+        execution.add_resource_usage(OrderedDict([("memout", True)]))
+
+def get_dominating_failure(settings, invocation):
+    """
+    Returns the identifier of an execution (within the logs directory) of the same precision sweep with a coarser precision that ran into the time or memory limit.
+    Such an execution implies that the given invocation fails as well. Returns None if there is no such execution.
+    Only executions with at least the time limit of the given invocation are considered, e.g., not the executions of a previous round with a smaller time limit (see deepening.py).
+    Batched invocations are never dominated since the limits of a batch do not apply to its individual benchmarks.
+    """
+    if len(invocation.batch) > 0:
+        return None
+    for configuration_id in get_coarser_configuration_ids(invocation.configuration_id):
+        identifier = "{}.{}.{}.run{}".format(invocation.tool, configuration_id, invocation.benchmark_id, invocation.run_id)
+        json_filename = os.path.join(settings.logs_dir(), identifier + ".json")
+        if not os.path.isfile(json_filename):
+            continue
+        execution_json = load_json(json_filename)
+        if execution_json.get("time-limit") is None or invocation.time_limit is None or execution_json["time-limit"] < invocation.time_limit:
+            continue
+        if is_failed_execution(execution_json):
+            return identifier
+    return None
+
+def save_inferred_timeout(settings, invocation, dominating_identifier : str):
+    """ Stores the log file and the execution results of the given (skipped) invocation as a timeout that is inferred from the given execution. Returns the execution results. """
+    execution_result = invocation.to_json()
+    execution_result["wallclock-time"] = float(invocation.time_limit)
+    execution_result["timeout"] = True
+    execution_result["execution-error"] = False
+    execution_result["inferred-timeout"] = True
+    execution_result["inferred-from"] = dominating_identifier
+    logfile_name = invocation.get_identifier() + ".log"
+    execution_result["log"] = logfile_name
+    with open(os.path.join(settings.logs_dir(), logfile_name), 'w') as logfile:
+        logfile.write("Invocation skipped: {} ran into the time or memory limit with a coarser precision.\n".format(dominating_identifier))
+    save_json(execution_result, os.path.join(settings.logs_dir(), invocation.get_identifier() + ".json"))
+    return execution_result
+
+def execute_invocation(settings, invocation, next_invocation = None):
+    """
+    Executes the given invocation and saves the results (see Invocation.execute and save_execution). Returns the execution results.
+    If pruning is enabled and a coarser precision of the same sweep already failed, the invocation is skipped and saved as an inferred timeout.
+    If the result cache contains the results of the invocation (and execution is not forced), the cached results are saved instead.
+    """
+    if settings.prune_dominated_invocations():
+        ensure_directory(settings.logs_dir())
+        dominating_identifier = get_dominating_failure(settings, invocation)
+        if dominating_identifier is not None:
+            return save_inferred_timeout(settings, invocation, dominating_identifier)
+    cache_key = None
+    if settings.result_cache_dir() is not None:
+        cache_key = get_result_cache_key(invocation)
+        if not settings.force_execution():
+            execution_result = load_cached_result(settings, invocation, cache_key)
+            if execution_result is not None:
+                return execution_result
+    execution = invocation.execute(settings, next_invocation)
+    detect_memout(execution)
+    execution_result = save_execution(settings, invocation, execution)
+    if cache_key is not None:
+        store_cached_result(settings, invocation, cache_key)
+    return execution_result
@@ -0,0 +1,63 @@
+from .utility import *
+import atexit
+
+def parse_reference_result(res):
+    """ Converts a reference result as stored in json files to the representation used for comparisons. """
+    if res is None:
+        return None
+    elif is_bool(res):
+        return bool(res)
+    elif is_interval(res):
+        return OrderedDict([(key, try_to_number(value) if key in ["lower", "upper"] else value) for key, value in res.items()])
+    else:
+        return try_to_number(res)
+
+class ReferenceResultStore(object):
+    """
+    Provides access to the reference results file.
+    The file is loaded only once and results are kept in their parsed form. Changes are only written to disk on flush.
+    """
+    def __init__(self, path : str):
+        self.path = path
+        self.json_data = load_json(path) if os.path.isfile(path) else OrderedDict()
+        self.parsed_values = dict() # identifier -> parsed value
+        self.changed = False
+
+    def contains(self, identifier : str):
+        return identifier in self.json_data
+
+    def get_value(self, identifier : str):
+        """ Returns the parsed reference result for the given benchmark identifier """
+        if identifier not in self.parsed_values:
+            self.parsed_values[identifier] = parse_reference_result(self.json_data[identifier]["value"])
+        return self.parsed_values[identifier]
+
+    def store(self, identifier : str, result, cfg : str):
+        """ Stores the given result that has been obtained using the given tool configuration """
+        if identifier in self.json_data:
+            if str(result) != str(self.json_data[identifier]["value"]):
+                print("Inconsistent reference result for {}.{}.\nGot {}\nbut entry is {}".format(cfg, identifier, result, self.json_data[identifier]))
+            if cfg not in self.json_data[identifier]["cfgs"]:
+                self.json_data[identifier]["cfgs"].append(cfg)
+                self.changed = True
+        else:
+            print("Found new ref res for {} using config {}".format(identifier, cfg))
+            self.json_data[identifier] = OrderedDict([("value", str(result)), ("cfgs", [cfg])])
+            self.parsed_values.pop(identifier, None)
+            self.changed = True
+
+    def flush(self):
+        """ Writes pending changes to disk """
+        if self.changed:
+            save_json(self.json_data, self.path)
+            self.changed = False
+
+_reference_result_store = None
+
+def get_reference_result_store():
+    """ Returns the (process-wide) store for the reference results file. Pending changes are flushed when the process exits. """
+    global _reference_result_store
+    if _reference_result_store is None:
+        _reference_result_store = ReferenceResultStore(os.path.join(sys.path[0], "internal/reference_results.json"))
+        atexit.register(_reference_result_store.flush)
+    return _reference_result_store
@@ -0,0 +1,84 @@
+from .utility import *
+from .invocation import *
+from datetime import datetime
+
+# The minimal number of runs before the confidence interval is considered
+MIN_REPETITIONS = 3
+# The confidence level of the confidence interval that has to be tight
+REPETITION_CONFIDENCE = 0.95
+
+def get_run(invocation, run_id : int):
+    """ Returns a copy of the given invocation with the given run id. """
+    run = Invocation(invocation.to_json())
+    run.run_id = run_id
+    return run
+
+def load_run_result(settings, journal, run):
+    """ Returns the execution results of the given run or None if the run has not been completed. """
+    identifier = run.get_identifier() if len(run.batch) == 0 else run.get_identifier(run.batch[0])
+    json_filename = os.path.join(settings.logs_dir(), identifier + ".json")
+    if not journal.is_completed(run.get_identifier()) or not os.path.isfile(json_filename):
+        return None
+    return load_json(json_filename)
+
+def is_successful_run(execution_result):
+    return not (execution_result.get("timeout", False) or execution_result.get("execution-error", False) or execution_result.get("memout", False))
+
+def is_repetition_finished(settings, results):
+    """ Returns true if no further runs are needed, i.e., if the confidence interval of the wall times is tight enough, the budget is exhausted, or a run was not successful. """
+    if len(results) == 0:
+        return False
+    if not all([is_successful_run(result) for result in results]):
+        return True # e.g. timeouts will not become more precise by repeating them
+    wall_times = [result["wallclock-time"] for result in results]
+    if len(results) >= settings.max_repetitions():
+        return True
+    if settings.repetition_budget() is not None and sum(wall_times) >= settings.repetition_budget():
+        return True
+    if len(results) < MIN_REPETITIONS:
+        return False
+    lower, upper = get_confidence_interval(wall_times, REPETITION_CONFIDENCE)
+    mean = sum(wall_times) / len(wall_times)
+    return mean <= 0 or (upper - lower) / mean <= settings.repetition_target()
+
+def run_invocations_adaptively(settings, invocations, journal, execute_invocations):
+    """
+    Executes each of the given invocations (ignoring their run ids) repeatedly until the confidence interval of its wall times is tight (see is_repetition_finished).
+    Runs are executed in rounds, where each round executes the next run (i.e. the next run id) of all invocations that need further runs.
+    The given function executes the runs of a round and returns false if the execution got interrupted. Completed runs are recorded in the given journal so that an interrupted execution resumes with the next run.
+    """
+    if settings.initial_time_limit() is not None:
+        raise AssertionError("Adaptive repetitions can not be combined with increasing time limits (initial-time-limit).")
+    series = OrderedDict() # identifier without run id -> (invocation, results of its runs)
+    for invocation in invocations:
+        identifier = invocation.get_identifier_no_run_id()
+        if identifier in series:
+            continue
+        results = []
+        while True:
+            result = load_run_result(settings, journal, get_run(invocation, len(results) + 1))
+            if result is None:
+                break
+            results.append(result)
+        series[identifier] = (invocation, results)
+    round_index = 0
+    while True:
+        active = [(invocation, results) for invocation, results in series.values() if not is_repetition_finished(settings, results)]
+        if len(active) == 0:
+            break
+        runs = [get_run(invocation, len(results) + 1) for invocation, results in active]
+        round_index += 1
+        print("\n{} Repetition round {}: executing the next run of {} of {} invocations.".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round_index, len(runs), len(series)))
+        completed = execute_invocations(settings, runs, journal)
+        for run, (invocation, results) in zip(runs, active):
+            result = load_run_result(settings, journal, run)
+            if result is None:
+                # the run failed (or has been interrupted). Do not repeat it forever
+                series[invocation.get_identifier_no_run_id()] = (invocation, results + [OrderedDict([("execution-error", True)])])
+            else:
+                results.append(result)
+        if not completed:
+            print("\nStopped after repetition round {}. Run the invocations again to resume.".format(round_index))
+            return
+    num_runs = sum([len([r for r in results if "wallclock-time" in r]) for invocation, results in series.values()])
+    print("\n{} Finished adaptive repetitions: {} runs of {} invocations.".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), num_runs, len(series)))
@@ -0,0 +1,82 @@
+from .utility import *
+from .buildcache import get_file_hash
+from .prefetch import get_command_files
+import hashlib, shutil
+
+# Increase this whenever the format of cached results changes. Invalidates all cached results.
+RESULT_CACHE_VERSION = 1
+
+# The fields of cached execution results that identify the invocation but are not covered by the key. They are replaced when a cached result is reused.
+_INVOCATION_FIELDS = ["tool", "configuration-id", "invocation-note"]
+
+def get_result_cache_key(invocation):
+    """
+    Computes the key of the results of the given invocation. It covers the command lines, the content of all files they refer to (the tool binary, the model and property files, converted or cached models, ...), the time and memory limit, and the run id.
+    The command lines are taken as they are (i.e. with the $MDPMC_DIR placeholder) so that the key does not depend on where the files are located.
+    """
+    sha = hashlib.sha256()
+    sha.update("version={}\n".format(RESULT_CACHE_VERSION).encode('utf-8'))
+    for command in invocation.commands:
+        sha.update("command={}\n".format(command).encode('utf-8'))
+        for path in get_command_files(command):
+            sha.update("file={}:{}\n".format(os.path.basename(path), get_file_hash(path)).encode('utf-8'))
+    sha.update("time-limit={}\nmemory-limit={}\nrun-id={}\nbatch={}\n".format(invocation.time_limit, invocation.memory_limit, invocation.run_id, ",".join(invocation.batch)).encode('utf-8'))
+    return sha.hexdigest()
+
+def _get_entry_path(settings, key : str):
+    return os.path.join(set_mdpmc_dir(settings.result_cache_dir()), key[:2], key)
+
+def _get_result_files(settings, invocation):
+    """ Returns the json files of the execution results of the given invocation (one for each benchmark of a batch). """
+    identifiers = [invocation.get_identifier()] if len(invocation.batch) == 0 else [invocation.get_identifier(benchmark_id) for benchmark_id in invocation.batch]
+    return [os.path.join(settings.logs_dir(), identifier + ".json") for identifier in identifiers]
+
+def store_cached_result(settings, invocation, key : str):
+    """ Copies the execution results (and the log) of the given invocation from the logs directory to the result cache. Failed executions are not cached. """
+    results = [load_json(f) for f in _get_result_files(settings, invocation)]
+    if any([result.get("execution-error", False) for result in results]):
+        return
+    entry_path = _get_entry_path(settings, key)
+    temp_path = entry_path + ".tmp{}".format(os.getpid())
+    ensure_directory(temp_path)
+    shutil.copyfile(os.path.join(settings.logs_dir(), results[0]["log"]), os.path.join(temp_path, "log"))
+    if "samples" in results[0]:
+        shutil.copyfile(os.path.join(settings.logs_dir(), results[0]["samples"]), os.path.join(temp_path, "samples"))
+    save_json(results, os.path.join(temp_path, "results.json"))
+    # the entry appears atomically so that concurrent executions never see an incomplete entry
+    try:
+        os.rename(temp_path, entry_path)
+    except OSError:
+        shutil.rmtree(temp_path, ignore_errors=True) # another execution stored the same results in the meantime
+
+def load_cached_result(settings, invocation, key : str):
+    """
+    Stores the cached execution results (and the log) of the given invocation within the logs directory as if the invocation was executed.
+    Returns the execution results or None if there are no cached results for the given key.
+    """
+    entry_path = _get_entry_path(settings, key)
+    if not os.path.isfile(os.path.join(entry_path, "results.json")):
+        return None
+    cached_results = load_json(os.path.join(entry_path, "results.json"))
+    ensure_directory(settings.logs_dir())
+    logfile_name = invocation.get_identifier() + ".log"
+    shutil.copyfile(os.path.join(entry_path, "log"), os.path.join(settings.logs_dir(), logfile_name))
+    samples_filename = None
+    if os.path.isfile(os.path.join(entry_path, "samples")):
+        samples_filename = invocation.get_identifier() + ".samples"
+        shutil.copyfile(os.path.join(entry_path, "samples"), os.path.join(settings.logs_dir(), samples_filename))
+    results = []
+    for cached_result, result_file in zip(cached_results, _get_result_files(settings, invocation)):
+        result = OrderedDict(cached_result)
+        invocation_json = invocation.to_json()
+        for field in _INVOCATION_FIELDS:
+            result[field] = invocation_json[field]
+        if len(invocation.batch) == 0:
+            result["benchmark-id"] = invocation.benchmark_id
+        result["log"] = logfile_name
+        if samples_filename is not None:
+            result["samples"] = samples_filename
+        result["result-cache-key"] = key
+        save_json(result, result_file)
+        results.append(result)
+    return results[0]
@@ -0,0 +1,105 @@
+from .utility import *
+from .benchmark import get_benchmark_from_id
+from .predictor import load_predictor
+from .pruning import get_sweep_key
+
+def load_runtime_history(logdirs):
+    """
+    Loads the wall times of previous executions from the given logs directories.
+    Returns a dictionary that maps invocation identifiers (without run id) to the list of observed wall times. Timeouts count as the time limit.
+    """
+    history = dict()
+    for logdir in logdirs:
+        logdir = os.path.expanduser(logdir)
+        if not os.path.isdir(logdir):
+            raise AssertionError("Runtime history directory '{}' does not exist.".format(logdir))
+        for json_filename in get_execution_json_files(logdir):
+            execution_json = load_json(os.path.join(logdir, json_filename))
+            if "wallclock-time" not in execution_json or execution_json.get("inferred-timeout", False):
+                continue
+            if execution_json.get("timeout", False):
+                runtime = execution_json["time-limit"]
+            elif "batch" in execution_json:
+                # the wall time of a batched execution covers all benchmarks of the batch
+                runtime = execution_json["wallclock-time"] / len(execution_json["batch"])
+            else:
+                runtime = execution_json["wallclock-time"]
+            identifier = "{}.{}.{}".format(execution_json["tool"], execution_json["configuration-id"], execution_json["benchmark-id"])
+            if identifier not in history:
+                history[identifier] = []
+            history[identifier].append(runtime)
+    return history
+
+def get_expected_runtime(invocation, history, predictor = None, settings = None):
+    """
+    Returns the expected runtime of the given invocation, i.e., the average wall time of previous executions.
+    If there are none, the runtime is predicted by the given runtime predictor (if any) or it is the time limit.
+    """
+    expected_runtime = 0.0
+    for benchmark_id in invocation.get_benchmark_ids():
+        runtimes = history.get(invocation.get_identifier_no_run_id(benchmark_id), [])
+        if len(runtimes) == 0:
+            if predictor is not None:
+                return predictor.predict_invocation(settings, invocation)
+            return float(invocation.time_limit)
+        expected_runtime += sum(runtimes) / len(runtimes)
+    return min(expected_runtime, float(invocation.time_limit))
+
+def partition_invocations(invocations, expected_runtimes, num_shards : int):
+    """
+    Deterministically partitions the given invocations into the given number of shards with (roughly) equal total expected runtime.
+    The invocations of a precision sweep are kept within the same shard so that failures of coarser precisions can be used to skip finer ones (see pruning.py).
+    Uses the longest processing time first heuristic. Returns, for each shard, the list of its invocations (in their original order).
+    """
+    groups = OrderedDict() # sweep (or position of invocations without sweep) -> positions within the list
+    for index, invocation in enumerate(invocations):
+        key = get_sweep_key(invocation)
+        if key is None:
+            key = index
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(index)
+    groups = list(groups.values())
+    group_runtimes = [sum([expected_runtimes[i] for i in group]) for group in groups]
+    shard_indices = [[] for shard in range(num_shards)]
+    shard_loads = [0.0] * num_shards
+    # ties are broken by the original position so that every shard computes the same partition
+    for g in sorted(range(len(groups)), key=lambda g: (-group_runtimes[g], groups[g][0])):
+        shard = min(range(num_shards), key=lambda s: (shard_loads[s], s))
+        shard_indices[shard] += groups[g]
+        shard_loads[shard] += group_runtimes[g]
+    return [[invocations[i] for i in sorted(indices)] for indices in shard_indices]
+
+def get_shard(settings, invocations, shard_index : int, num_shards : int):
+    """ Returns the invocations of the given shard (numbered from 1 to num_shards) together with the expected runtime of the shard. """
+    if shard_index < 1 or shard_index > num_shards:
+        raise AssertionError("Invalid shard {}/{}: the shard index has to be between 1 and {}.".format(shard_index, num_shards, num_shards))
+    history = load_runtime_history(settings.runtime_history_dirs())
+    predictor = load_predictor(settings)
+    expected_runtimes = [get_expected_runtime(invocation, history, predictor, settings) for invocation in invocations]
+    shard = partition_invocations(invocations, expected_runtimes, num_shards)[shard_index - 1]
+    return shard, sum([get_expected_runtime(invocation, history, predictor, settings) for invocation in shard])
+
+def get_model_size(settings, invocation):
+    """ Returns the (maximum) number of states of the benchmarks of the given invocation. Benchmarks without known state numbers count as 0. """
+    size = 0
+    for benchmark_id in invocation.get_benchmark_ids():
+        num_states = get_benchmark_from_id(settings, benchmark_id).get_max_num_states()
+        if num_states is not None:
+            size += num_states
+    return size
+
+def order_invocations(settings, invocations):
+    """
+    Orders the given invocations according to the invocation order of the settings.
+    Invocations are sorted by their expected runtime. Invocations with the same expected runtime (e.g. without previous results) are sorted by the size of their model and otherwise keep their original order.
+    """
+    order = settings.invocation_order()
+    if order == "original":
+        return invocations
+    history = load_runtime_history(settings.runtime_history_dirs())
+    predictor = load_predictor(settings)
+    keys = [(get_expected_runtime(invocation, history, predictor, settings), get_model_size(settings, invocation)) for invocation in invocations]
+    # sorting is stable (also in reverse), i.e., ties keep their original order
+    indices = sorted(range(len(invocations)), key=lambda i: keys[i], reverse=(order == "longest-first"))
+    return [invocations[i] for i in indices]
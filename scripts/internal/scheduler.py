@@ -0,0 +1,130 @@
+from .utility import *
+from .invocation import *
+from .pruning import execute_invocation
+from .execution import set_memory_limit
+import multiprocessing, queue, traceback
+
+# The memory that is kept for the benchmarking scripts, the operating system, and the page cache if the settings do not specify it: a fraction of the total memory but at least the given amount (in MB)
+DEFAULT_RESERVED_MEMORY_FRACTION = 0.1
+MIN_DEFAULT_RESERVED_MEMORY = 2048
+
+def get_available_cores():
+    """ Returns the list of cores this process is allowed to run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+def get_total_memory():
+    """ Returns the amount of physical memory (in MB) or None if it can not be determined. """
+    try:
+        return (os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")) // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class WorkerSlot(object):
+    """ The resources (cores and memory) that are exclusively reserved for a single worker. """
+    def __init__(self, index, cores, memory_limit, rlimit_kind = "data"):
+        self.index = index
+        self.cores = cores
+        self.memory_limit = memory_limit
+        self.rlimit_kind = rlimit_kind
+
+    def apply(self, pid = 0):
+        """ Restricts the process with the given pid (the current process by default) and all processes spawned from it afterwards to the resources of this slot. """
+        if hasattr(os, "sched_setaffinity") and len(self.cores) > 0:
+            os.sched_setaffinity(pid, self.cores)
+        set_memory_limit(self.memory_limit, pid, self.rlimit_kind)
+
+    def __str__(self):
+        return "Worker #{}: cores {}, memory limit {}".format(self.index, self.cores, "none" if self.memory_limit is None else "{} MB".format(self.memory_limit))
+
+def get_worker_slots(settings):
+    """
+    Distributes the available cores and memory among the workers. Some memory is reserved for everything else (see Settings.reserved_memory).
+    Raises an error if the requested number of workers would oversubscribe the machine.
+    """
+    num_workers = settings.num_workers()
+    cores_per_worker = settings.cores_per_worker()
+    cores = get_available_cores()
+    if num_workers * cores_per_worker > len(cores):
+        raise AssertionError("Running {} workers with {} core(s) each would oversubscribe the machine: only {} cores are available.".format(num_workers, cores_per_worker, len(cores)))
+    total_memory = get_total_memory()
+    available_memory = None
+    if total_memory is not None:
+        reserved_memory = settings.reserved_memory()
+        if reserved_memory is None:
+            reserved_memory = min(max(int(total_memory * DEFAULT_RESERVED_MEMORY_FRACTION), MIN_DEFAULT_RESERVED_MEMORY), total_memory // 2)
+        available_memory = total_memory - reserved_memory
+    memory_limit = settings.memory_per_worker()
+    if memory_limit is None and available_memory is not None:
+        memory_limit = available_memory // num_workers
+    if memory_limit is not None and available_memory is not None and num_workers * memory_limit > available_memory:
+        raise AssertionError("Running {} workers with {} MB each would oversubscribe the machine: only {} MB are available ({} MB are reserved).".format(num_workers, memory_limit, available_memory, total_memory - available_memory))
+    if memory_limit is not None and available_memory is not None and memory_limit <= 0:
+        raise AssertionError("Running {} workers would oversubscribe the machine: only {} MB are available ({} MB are reserved).".format(num_workers, available_memory, total_memory - available_memory))
+    return [WorkerSlot(i, cores[i * cores_per_worker : (i + 1) * cores_per_worker], memory_limit, settings.memory_rlimit_kind()) for i in range(num_workers)]
+
+
+def _worker_main(settings, slot, task_queue, result_queue):
+    """ Executes invocations from the task queue until a 'None' task is received. """
+    try:
+        slot.apply()
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            invocation_index, invocation = task
+            try:
+                execution_result = execute_invocation(settings, invocation)
+                result_queue.put((invocation_index, execution_result, None))
+            except Exception:
+                result_queue.put((invocation_index, None, traceback.format_exc()))
+    except KeyboardInterrupt:
+        pass
+
+def run_invocations_in_parallel(settings, invocations, journal = None):
+    """
+    Executes the given invocations using a pool of workers, where each worker is pinned to its own cores and has its own memory limit.
+    Each worker stores the log and json files of its executions exactly as a sequential execution would do.
+    Finished invocations are recorded in the given journal (if any). Returns false if the execution got interrupted.
+    """
+    slots = get_worker_slots(settings)
+    print("\nExecuting invocations using {} workers:\n\t{}".format(len(slots), "\n\t".join([str(slot) for slot in slots])))
+    context = multiprocessing.get_context("fork")
+    task_queue = context.Queue()
+    result_queue = context.Queue()
+    for invocation_index, invocation in enumerate(invocations):
+        task_queue.put((invocation_index, invocation))
+    for slot in slots:
+        task_queue.put(None) # tells the worker to stop
+    workers = [context.Process(target=_worker_main, args=(settings, slot, task_queue, result_queue)) for slot in slots]
+    for worker in workers:
+        worker.start()
+    progressbar = Progressbar(len(invocations), "Executing invocations")
+    num_finished = 0
+    try:
+        while num_finished < len(invocations):
+            try:
+                invocation_index, execution_result, error = result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any([worker.is_alive() for worker in workers]):
+                    print("\nERROR: All workers stopped before all invocations were processed.")
+                    return False
+                continue
+            num_finished += 1
+            progressbar.print_progress(num_finished)
+            if error is not None:
+                print("\nERROR while processing invocation #{}: {}\n{}".format(invocation_index, invocations[invocation_index].get_identifier(), error))
+            elif journal is not None:
+                journal.record(invocations[invocation_index].get_identifier(), execution_result)
+    except KeyboardInterrupt:
+        print("\nInterrupt while processing invocations ({} of {} finished).".format(num_finished, len(invocations)))
+        return False
+    finally:
+        task_queue.cancel_join_thread()
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+    return True
@@ -2,6 +2,8 @@ from .benchmark import Benchmark
 from .invocation import Invocation
 from .execution import *
 from .configuration import *
+from .buildcache import *
+import functools
 
 def get_name():
     """ should return the name of the tool """
@@ -59,9 +61,28 @@ def get_configurations():
     return cfgs
 
 
-def get_invocation(settings, benchmark : Benchmark, configuration : Configuration, run_id : int):
+def get_cached_model(settings, storm_executable, input_files, model_arguments, property_file, property_names):
+    """
+    Returns the (portable) path of the cached explicit model that is built from the given input files and arguments, or None if the model is not (yet) cached or if one of the given properties can not be checked on the cached model.
+    The properties are checked on the cached model using the given PRISM property file. Only properties that refer to labels and reward models can be checked (see is_property_supported_by_explicit_model).
+    If the model is not cached yet, the command that builds it is appended to the build cache script.
+    """
+    if settings.build_cache_dir() is None or not all([is_property_supported_by_explicit_model(property_file, name) for name in property_names]):
+        return None
+    key = get_build_cache_key(storm_executable, input_files, model_arguments)
+    cached_model = os.path.join(settings.build_cache_dir(), "storm-{}.drn".format(key))
+    if os.path.isfile(set_mdpmc_dir(cached_model)):
+        return cached_model
+    ensure_directory(set_mdpmc_dir(settings.build_cache_dir()))
+    # The model is exported to a temporary file first so that an aborted build does not leave a corrupt model in the cache
+    temp_model = os.path.join(settings.build_cache_dir(), "storm-{}.tmp.drn".format(key))
+    request_build("{} {} --buildfull --exportbuild {} && mv {} {}".format(storm_executable, model_arguments, temp_model, temp_model, cached_model))
+    return None
+
+def get_invocation(settings, benchmark : Benchmark, configuration : Configuration, run_id : int, batch = None):
     """
     Returns an invocation that invokes the tool for the given benchmark and the given storm configuration.
+    If a batch of benchmarks is given (which only differ from the given benchmark in their property), the properties of all these benchmarks are checked within the same invocation.
     It can be assumed that the current directory is the directory from which execute_invocations.py is executed.
     """
     general_arguments = "--timemem --statistics" # Prints some timing and memory information
@@ -72,20 +93,32 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
     invocation.note = configuration.note
     invocation.benchmark_id = benchmark.get_identifier()
     invocation.run_id = run_id
+    property_names = [benchmark.get_property_name()]
+    if batch is not None:
+        invocation.batch = [b.get_identifier() for b in batch]
+        property_names = [b.get_property_name() for b in batch]
     
     if is_benchmark_supported(benchmark, configuration):
         bdir = benchmark.get_portable_directory()
         storm_executable = os.path.join(settings.storm_binary_dir(), "storm")
 
         if ("prism" in configuration.identifier and benchmark.is_prism() or benchmark.is_prism_ma()) and not benchmark.is_pta():
-            benchmark_arguments = "--prism {} --prop {} {}".format(os.path.join(bdir, benchmark.get_prism_program_filename()), os.path.join(bdir, benchmark.get_prism_property_filename()), benchmark.get_property_name())
+            prism_file = os.path.join(bdir, benchmark.get_prism_program_filename())
+            property_file = os.path.join(bdir, benchmark.get_prism_property_filename())
+            model_options = ""
             if benchmark.get_open_parameter_def_string() != "":
-                benchmark_arguments += " --constants {}".format(benchmark.get_open_parameter_def_string())
+                model_options += " --constants {}".format(benchmark.get_open_parameter_def_string())
             if benchmark.is_ctmc():
-                benchmark_arguments += " --prismcompat"
+                model_options += " --prismcompat"
                 invocation.note += " Use `--prismcompat` to ensure compatibility with prism benchmark."
+            cached_model = get_cached_model(settings, storm_executable, [prism_file], "--prism {}{}".format(prism_file, model_options), property_file, property_names)
+            if cached_model is not None:
+                benchmark_arguments = "--explicit-drn {} --prop {} {}".format(cached_model, property_file, ",".join(property_names))
+                invocation.note += " Loaded the model from the build cache."
+            else:
+                benchmark_arguments = "--prism {} --prop {} {}{}".format(prism_file, property_file, ",".join(property_names), model_options)
         elif benchmark.is_drn():
-            benchmark_arguments = "--explicit-drn {} --prop {} {}".format(os.path.join(bdir, benchmark.get_drn_filename()), os.path.join(bdir, benchmark.get_drn_property_filename()), benchmark.get_property_name())
+            benchmark_arguments = "--explicit-drn {} --prop {} {}".format(os.path.join(bdir, benchmark.get_drn_filename()), os.path.join(bdir, benchmark.get_drn_property_filename()), ",".join(property_names))
             assert(benchmark.get_open_parameter_def_string() == "")
         else:
             # For jani input, it might be the case that preprocessing is necessary using moconv
@@ -116,9 +149,20 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
                         moconvscript.write(moconv_command)
                     print("Required moconv call appended to file 'moconv.sh'")
                 janifile = moconvoutfilename
-            benchmark_arguments = "--jani {} --janiproperty {}".format(os.path.join(bdir, janifile), benchmark.get_property_name())
+            jani_path = os.path.join(bdir, janifile)
+            model_arguments = "--jani {} --janiproperty {}".format(jani_path, ",".join(property_names))
             if par_defs != "":
-                benchmark_arguments += " --constants " + par_defs
+                model_arguments += " --constants " + par_defs
+            cached_model = None
+            if (benchmark.is_prism() or benchmark.is_prism_ma() or benchmark.is_prism_inf()) and os.path.isfile(set_mdpmc_dir(jani_path)):
+                # The labels and reward models of a jani model converted from PRISM have the names of the original ones. Thus, the original PRISM properties can be checked on the cached model.
+                property_file = os.path.join(bdir, benchmark.get_prism_property_filename())
+                cached_model = get_cached_model(settings, storm_executable, [jani_path], model_arguments, property_file, property_names)
+            if cached_model is not None:
+                benchmark_arguments = "--explicit-drn {} --prop {} {}".format(cached_model, property_file, ",".join(property_names))
+                invocation.note += " Loaded the model from the build cache."
+            else:
+                benchmark_arguments = model_arguments
         cfg_cmd = configuration.command.replace(RANDOM_SEED_TOKEN, str(get_seed(run_id)))
         invocation.add_command(storm_executable + " " + benchmark_arguments + " " + cfg_cmd + " " + general_arguments)
     else:
@@ -127,170 +171,266 @@ def get_invocation(settings, benchmark : Benchmark, configuration : Configuratio
 
 
 
+# if one of the following error messages occurs, we are sure that the model is not supported.
+NOT_SUPPORTED_MESSAGES = [
+    "Unable to compute finite upper bounds for visiting times",
+    "The equation system has no solution",
+    "qcomp/benchmarks/pta/",
+    "Scheduler extraction is not yet implemented for LP based LRA method.",
+    "The model checking query does not seem to be supported for the selected engine. Storm will try to solve the query, but you will most likely get an error for at least one of the provided properties."
+]
+
+# known error messages that are to be expected
+EXPECTED_ERROR_MESSAGES = []
+
+# error messages indicating an out of memory situation
+MEMOUT_MESSAGES = [
+    "Maximum memory exceeded.",
+    "BDD Unique table full",
+    "ERROR: The program received signal 11",
+    "Unable to optimize Gurobi model (Out of memory, error code 10001).",
+    "std::bad_alloc" # allocation failed due to the memory limit (setrlimit)
+]
+
+# the prefix of all lines that report the time of a phase (e.g. 'Time for model checking: 1.234s.')
+PHASE_TIME_PREFIX = "Time for model "
+PHASE_TIME_PHASES = ["construction", "preprocessing", "checking", "solving"]
+
+class LogInfo(object):
+    """
+    All information that can be extracted from a Storm log.
+    Each piece of information is extracted when it is accessed for the first time, so that the (possibly huge) log is only searched for the information that is actually needed.
+    The times of all phases are extracted in a single search.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.property_infos = dict() # property name -> LogInfo of the part of the log that belongs to the property
+
+    @functools.cached_property
+    def phase_times(self):
+        """ The times of the phases (see PHASE_TIME_PHASES) that occur in the log, i.e., the text between the first occurrence of 'Time for model <phase>: ' and the subsequent occurrence of 's.'. """
+        result = dict()
+        pos = self.log.find(PHASE_TIME_PREFIX)
+        while pos >= 0 and len(result) < len(PHASE_TIME_PHASES):
+            pos += len(PHASE_TIME_PREFIX)
+            for phase in PHASE_TIME_PHASES:
+                if phase not in result and self.log.startswith(phase + ": ", pos):
+                    time_pos = pos + len(phase) + 2
+                    result[phase] = float(self.log[time_pos:self.log.find("s.", time_pos)])
+            pos = self.log.find(PHASE_TIME_PREFIX, pos)
+        return result
+
+    @property
+    def build_time(self):
+        return self.phase_times.get("construction")
+
+    @property
+    def preprocessing_time(self):
+        return self.phase_times.get("preprocessing")
+
+    @property
+    def mc_time(self):
+        return self.phase_times.get("checking")
+
+    @property
+    def solve_time(self):
+        return self.phase_times.get("solving")
+
+    @functools.cached_property
+    def iterations(self):
+        iterations = self._get_text_between("Multi-objective Pareto Curve Approximation algorithm terminated after ", " refinement steps.\n")
+        return None if iterations is None else int(iterations)
+
+    @functools.cached_property
+    def nontriv_mec_percentage(self):
+        pos1 = self.log.find("are trivial, i.e., consist of a single state. ")
+        if pos1 < 0:
+            return None
+        pos2 = self.log.find("%) are on a non-trivial mec.", pos1)
+        return float(self.log[self.log.rfind("(", pos1, pos2) + 1:pos2])
+
+    @functools.cached_property
+    def nontriv_scc_states(self):
+        nontriv_scc_states = self._get_text_between("Number of states in non-trivial SCC: ", ".")
+        return None if nontriv_scc_states is None else int(nontriv_scc_states)
+
+    @functools.cached_property
+    def bisimulation(self):
+        # both options contain 'bisim', so a single search suffices
+        pos = self.log.find("bisim")
+        while pos >= 0:
+            if self.log.startswith("-bisim ", pos - 1) or self.log.startswith("--bisimulation", pos - 2):
+                return True
+            pos = self.log.find("bisim", pos + 1)
+        return False
+
+    @functools.cached_property
+    def acyclic(self):
+        if "##Acyclic" in self.log:
+            return True
+        elif "##Cyclic" in self.log:
+            return False
+        else:
+            return None
+
+    @functools.cached_property
+    def not_supported(self):
+        return any([m in self.log for m in NOT_SUPPORTED_MESSAGES])
+
+    @functools.cached_property
+    def expected_error(self):
+        return any([m in self.log for m in EXPECTED_ERROR_MESSAGES])
+
+    @functools.cached_property
+    def memout(self):
+        # if there is no error message and no result is produced, we assume out of memory.
+        return any([m in self.log for m in MEMOUT_MESSAGES]) or "ERROR" not in self.log
+
+    def _get_text_between(self, start, end):
+        """ Returns the text between the first occurrence of start and the subsequent occurrence of end (or None if start does not occur). """
+        pos = self.log.find(start)
+        if pos < 0:
+            return None
+        pos += len(start)
+        return self.log[pos:self.log.find(end, pos)]
+
+    def get_property_log(self, property_name):
+        """ Returns the part of the log that belongs to the given property, i.e., the text until the next property is checked (or None if the property is not checked). """
+        pos = self.log.find("Model checking property \"{}\":".format(property_name))
+        if pos < 0:
+            return None
+        end_pos = self.log.find("\nModel checking property \"", pos)
+        return self.log[pos:] if end_pos < 0 else self.log[pos:end_pos]
+
+    def get_mc_time(self, property_name):
+        """ Returns the model checking time of the given property (or None if there is none). Useful if multiple properties are checked in one invocation. """
+        property_info = self._get_property_info(property_name)
+        return None if property_info is None else property_info.mc_time
+
+    def get_iterations(self, property_name):
+        """ Returns the number of refinement steps for the given property (or None if there are none). Useful if multiple properties are checked in one invocation. """
+        property_info = self._get_property_info(property_name)
+        return None if property_info is None else property_info.iterations
+
+    def _get_property_info(self, property_name):
+        if property_name not in self.property_infos:
+            property_log = self.get_property_log(property_name)
+            self.property_infos[property_name] = None if property_log is None else LogInfo(property_log)
+        return self.property_infos[property_name]
+
+    def get_result(self, property_name):
+        """ Returns the result for the given property (or None if there is none). """
+        pos = self.log.find("Model checking property \"{}\":".format(property_name))
+        if pos < 0:
+            return None
+        pos = self.log.find("Result (for initial states): ", pos)
+        if pos < 0:
+            return None
+        pos = pos + len("Result (for initial states): ")
+        end_pos = self.log.find("Time for model checkin", pos)
+        if end_pos < 0:
+            end_pos = len(self.log) - 1 # as for slicing, the last character is excluded
+        # The result might be huge (e.g. a Pareto curve). Instead of copying it multiple times, the whitespace at its beginning and end is skipped within the log
+        while pos < end_pos and self.log[pos].isspace():
+            pos += 1
+        while end_pos > pos and self.log[end_pos - 1].isspace():
+            end_pos -= 1
+        pos_appr = self.log.find("(approx. ", pos, end_pos)
+        return self.log[pos:end_pos if pos_appr < 0 else pos_appr]
+
+def parse_log(log):
+    """
+    Parses the given log and returns a LogInfo object
+    """
+    return LogInfo(log)
+
+_last_log_info = None
+
+def _get_log_info(log):
+    """ Returns the LogInfo of the given log. The LogInfo of the most recently given log is reused so that subsequent calls of the functions below search the log only once for each piece of information. """
+    global _last_log_info
+    if _last_log_info is None or _last_log_info.log is not log:
+        _last_log_info = LogInfo(log)
+    return _last_log_info
+
 def get_result(log, benchmark : Benchmark):
     """
     Parses the tool result
     """
+    return _get_log_info(log).get_result(benchmark.get_property_name())
 
-    pos = log.find("Model checking property \"{}\":".format(benchmark.get_property_name()))
-    if pos < 0:
-        return None
-    pos = log.find("Result (for initial states): ", pos)
-    if pos < 0:
-        return None
-    pos = pos + len("Result (for initial states): ")
-    end_pos = log.find("Time for model checkin", pos)
-    result = log[pos:end_pos].strip()
-    pos_appr = result.find("(approx. ")
-    if pos_appr >= 0:
-        result = result[:pos_appr]
-    return result
-    
 def get_MC_Time(logfile):
     """
     Tries to parse the model checking time
     """
-    pos = logfile.find("Time for model checking: ")
-    if pos >= 0:
-        pos += len("Time for model checking: ")
-        pos2 = logfile.find("s.", pos)
-        num = logfile[pos:pos2]
-        return float(num)
-    return None
+    return _get_log_info(logfile).mc_time
 
 def get_iterations(logfile):
     """
     Tries to parse the number of iterations
     """
-    pos = logfile.find("Multi-objective Pareto Curve Approximation algorithm terminated after ")
-    if pos >= 0:
-        pos += len("Multi-objective Pareto Curve Approximation algorithm terminated after ")
-        pos2 = logfile.find(" refinement steps.\n", pos)
-        num = logfile[pos:pos2]
-        return int(num)
-    return None
+    return _get_log_info(logfile).iterations
 
 def is_bisimulation_used(logfile):
     """
     Tries to parse the bisimulation usage
     """
-    return "-bisim " in logfile or "--bisimulation" in logfile
+    return _get_log_info(logfile).bisimulation
 
 def get_preprocessing_time(logfile):
     """
     Tries to parse the model checking time
     """
-    pos = logfile.find("Time for model preprocessing: ")
-    if pos >= 0:
-        pos += len("Time for model preprocessing: ")
-        pos2 = logfile.find("s.", pos)
-        num = logfile[pos:pos2]
-        return float(num)
-    return None
+    return _get_log_info(logfile).preprocessing_time
 
 def get_Solve_Time(logfile):
   """
   Tries to parse the solving time of the underlying solution method (model checking time without prob0/1, ... preprocessing)
   """
-  pos = logfile.find("Time for model solving: ")
-  if pos >= 0:
-      pos += len("Time for model solving: ")
-      pos2 = logfile.find("s.", pos)
-      num = logfile[pos:pos2]
-      return float(num)
-  return None
-    
+  return _get_log_info(logfile).solve_time
+
 def get_Build_Time(logfile):
     """
     Tries to parse the model building time
     """
-    pos = logfile.find("Time for model construction: ")
-    if pos >= 0:
-        pos += len("Time for model construction: ")
-        pos2 = logfile.find("s.", pos)
-        num = logfile[pos:pos2]
-        return float(num)
-    return None
+    return _get_log_info(logfile).build_time
 
 def get_nontriv_mec_percentage(logfile):
     """
     Tries to parse the percentage of MEC states
     """
-    pos1 = logfile.find("are trivial, i.e., consist of a single state. ")
-    if pos1 >= 0:
-        pos2 = logfile.find("%) are on a non-trivial mec.", pos1)
-        pos1 = logfile.rfind("(", pos1, pos2) + 1
-        num = logfile[pos1:pos2]
-        return float(num)
-    return None
+    return _get_log_info(logfile).nontriv_mec_percentage
 
 
 def get_Acyclic(logfile):
     """
     Tries to find information whether or not the model is acyclic. Returns None if the information was not found
     """
-    if "##Acyclic" in logfile:
-        return True
-    elif "##Cyclic" in logfile:
-        return False
-    else:
-        return None
-    
-      
+    return _get_log_info(logfile).acyclic
+
+
 def get_NonTriv_Scc_States(logfile):
     """
     Tries to parse the number of non-trivial scc states from the logfile
     """
-    pos = logfile.find("Number of states in non-trivial SCC: ")
-    if pos >= 0:
-        pos += len("Number of states in non-trivial SCC: ")
-        pos2 = logfile.find(".", pos)
-        num = logfile[pos:pos2]
-        return int(num)
-    return None
+    return _get_log_info(logfile).nontriv_scc_states
 
 def is_not_supported(logfile):
     """
     Returns true if the logfile contains error messages that mean that the input is not supported.
     """
-    # if one of the following error messages occurs, we are sure that the model is not supported.
-    known_messages = []
-    known_messages.append("Unable to compute finite upper bounds for visiting times")
-    known_messages.append("The equation system has no solution")
-    known_messages.append("qcomp/benchmarks/pta/")
-    known_messages.append("Scheduler extraction is not yet implemented for LP based LRA method.")
-    known_messages.append("The model checking query does not seem to be supported for the selected engine. Storm will try to solve the query, but you will most likely get an error for at least one of the provided properties.")
-
-    # known_messages.append("")
-    for m in known_messages:
-        if m in logfile:
-            return True
-            
-    return False
+    return _get_log_info(logfile).not_supported
 
 
 def is_expected_error(logfile):
     """
     Returns true if the logfile contains a known error message that is to be expected.
     """
-    known_messages = []
-    for m in known_messages:
-        if m in logfile:
-            return True
-    return False
+    return _get_log_info(logfile).expected_error
 
 def is_memout(logfile):
     """
     Returns true if the logfile indicates an out of memory situation.
     Assumes that a result could not be parsed successfully.
     """
-    known_messages = []
-    known_messages.append("Maximum memory exceeded.")
-    known_messages.append("BDD Unique table full")
-    known_messages.append("ERROR: The program received signal 11")
-    known_messages.append("Unable to optimize Gurobi model (Out of memory, error code 10001).")
-    for m in known_messages:
-        if m in logfile:
-            return True
-    # if there is no error message and no result is produced, we assume out of memory.
-    return "ERROR" not in logfile
+    return _get_log_info(logfile).memout
@@ -5,6 +5,7 @@ import math
 import csv
 import json
 import shutil
+import statistics
 
 from decimal import *
 from fractions import *
@@ -58,6 +59,33 @@ def is_valid_filename(name : str, invalid_chars = None):
         return False
     return True
 
+def get_shard_directory_name(shard_index : int, num_shards : int):
+    """ Returns the name of the subdirectory of the logs directory that holds the results of the given shard (shards are numbered from 1 to num_shards). """
+    return "shard-{}-of-{}".format(shard_index, num_shards)
+
+def is_shard_directory_name(name : str):
+    parts = name.split("-")
+    return len(parts) == 4 and parts[0] == "shard" and parts[2] == "of" and parts[1].isdigit() and parts[3].isdigit()
+
+def is_execution_json_filename(name : str):
+    """ Returns true if the given file name is the name of an execution json file, i.e., of the form '<tool>.<configuration>.<benchmark>.run<k>.json' (see Invocation.get_identifier). """
+    parts = name.split(".")
+    return len(parts) >= 5 and parts[-1] == "json" and parts[-2].startswith("run") and parts[-2][len("run"):].isdigit()
+
+def _get_execution_json_files_in(directory : str):
+    return [f for f in os.listdir(directory) if is_execution_json_filename(f) and os.path.isfile(os.path.join(directory, f))]
+
+def get_execution_json_files(logdir : str):
+    """
+    Returns the (sorted) paths of all execution json files within the given logs directory (including the subdirectories of shards), relative to the logs directory.
+    Other json files (e.g. copies of the settings or runtime predictors) are ignored.
+    """
+    json_files = _get_execution_json_files_in(logdir)
+    for shard_dir in os.listdir(logdir):
+        if is_shard_directory_name(shard_dir) and os.path.isdir(os.path.join(logdir, shard_dir)):
+            json_files += [os.path.join(shard_dir, f) for f in _get_execution_json_files_in(os.path.join(logdir, shard_dir))]
+    return sorted(json_files) # sorted to get deterministic results
+
 def remove_directory_contents(directory, exluded = []):
     for name in os.listdir(directory):
         if name not in exluded:
@@ -201,6 +229,27 @@ def is_result_correct(settings, reference, result):
     else:
         return reference == result
 
+def get_t_quantile(probability : float, degrees_of_freedom : int) -> float:
+    """ Returns the quantile of Student's t-distribution with the given degrees of freedom, e.g., get_t_quantile(0.975, 9) is approx. 2.262. """
+    if degrees_of_freedom < 1:
+        raise AssertionError("Invalid degrees of freedom {} for t-distribution.".format(degrees_of_freedom))
+    if degrees_of_freedom == 1:
+        return math.tan(math.pi * (probability - 0.5))
+    if degrees_of_freedom == 2:
+        return (2 * probability - 1) * math.sqrt(2 / (4 * probability * (1 - probability)))
+    # Cornish-Fisher expansion around the normal quantile (relative error below 0.1% for 3 or more degrees of freedom)
+    z = statistics.NormalDist().inv_cdf(probability)
+    n = degrees_of_freedom
+    return z + (z**3 + z) / (4 * n) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * n**2) + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * n**3) + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * n**4)
+
+def get_confidence_interval(values, confidence : float = 0.95):
+    """ Returns the confidence interval (lower, upper) for the mean of the given values (assuming they are normally distributed) or None if there are less than two values. """
+    if len(values) < 2:
+        return None
+    mean = statistics.mean(values)
+    half_width = get_t_quantile(0.5 + confidence / 2, len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+    return mean - half_width, mean + half_width
+
 def get_seed(index : int) -> int:
     return index ^ ((index<<6) + (index>>2))
 
@@ -233,6 +282,7 @@ class Settings(object):
     def __init__(self):
         self.settings_filename = "settings.json"
         self.json_data = OrderedDict()
+        self.forced_execution = False # set by the --force argument of run.py, never stored in the settings.json file
         if os.path.isfile(self.settings_filename):
             self.json_data = load_json(self.settings_filename)
         if self.set_defaults():
@@ -311,6 +361,61 @@ class Settings(object):
         """ Retrieves the time limit for tool executions (in seconds). """
         return int(self.json_data["time-limit"])
 
+    def repetition_target(self):
+        """ Retrieves the target width of the 95% confidence interval of the wall time (relative to the mean) if invocations are repeated adaptively or None if each invocation is executed once.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "repetition-target" in self.json_data or self.json_data["repetition-target"] in [None, False, 0]:
+            return None
+        return float(self.json_data["repetition-target"])
+
+    def max_repetitions(self):
+        """ Retrieves the maximal number of runs of an invocation if invocations are repeated adaptively (see repetition_target).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "max-repetitions" in self.json_data:
+            return 10
+        return int(self.json_data["max-repetitions"])
+
+    def repetition_budget(self):
+        """ Retrieves the maximal total wall time (in seconds) of all runs of an invocation if invocations are repeated adaptively (see repetition_target) or None if there is no such budget.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "repetition-budget" in self.json_data or self.json_data["repetition-budget"] in [None, False, 0]:
+            return None
+        return float(self.json_data["repetition-budget"])
+
+    def initial_time_limit(self):
+        """ Retrieves the time limit (in seconds) of the first round if invocations are executed in rounds with increasing time limits (up to the time limit of the invocation) or None if invocations are executed only once.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "initial-time-limit" in self.json_data or self.json_data["initial-time-limit"] in [None, False, 0]:
+            return None
+        return int(self.json_data["initial-time-limit"])
+
+    def time_limit_factor(self):
+        """ Retrieves the factor by which the time limit increases from one round to the next (see initial_time_limit).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "time-limit-factor" in self.json_data:
+            return 4
+        if self.json_data["time-limit-factor"] <= 1:
+            raise AssertionError("The time limit factor has to be larger than 1 but is {}.".format(self.json_data["time-limit-factor"]))
+        return self.json_data["time-limit-factor"]
+
+    def memory_limit(self):
+        """ Retrieves the memory limit for tool executions (in MB) or None if the memory is not limited.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "memory-limit" in self.json_data or self.json_data["memory-limit"] in [None, False, 0]:
+            return None
+        return int(self.json_data["memory-limit"])
+
+    def memory_rlimit_kind(self):
+        """ Retrieves how the memory limit is enforced if cgroups are not available: either 'data' (RLIMIT_DATA, the default) or 'address-space' (RLIMIT_AS).
+            RLIMIT_DATA only counts memory that is actually usable. RLIMIT_AS also counts address space that is merely reserved (e.g. by the .NET runtime of mcsta or the JVM), i.e., such tools might fail far below the memory limit.
+            On platforms other than Linux, RLIMIT_DATA does not cover mmap-ed memory, so RLIMIT_AS is used in any case.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "memory-rlimit-kind" in self.json_data:
+            return "data"
+        if self.json_data["memory-rlimit-kind"] not in ["data", "address-space"]:
+            raise AssertionError("Unknown memory rlimit kind '{}'. Expected 'data' or 'address-space'.".format(self.json_data["memory-rlimit-kind"]))
+        return self.json_data["memory-rlimit-kind"]
+
     def goal_precision(self):
         """ Retrieves the precision the tools have to achieved for numerical results. """
         if self.json_data["goal-precision"] == False:
@@ -336,6 +441,157 @@ class Settings(object):
             return [os.path.realpath(sys.path[0]) + "/", os.path.expanduser("~") + "/"]
         return self.json_data["filtered-paths"]
 
+    def num_workers(self):
+        """ Retrieves the number of invocations that are executed simultaneously.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "parallel-workers" in self.json_data:
+            return 1
+        return max(1, int(self.json_data["parallel-workers"]))
+
+    def cores_per_worker(self):
+        """ Retrieves the number of cores each worker is pinned to.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "cores-per-worker" in self.json_data:
+            return 1
+        return max(1, int(self.json_data["cores-per-worker"]))
+
+    def memory_per_worker(self):
+        """ Retrieves the memory limit (in MB) for each worker or None if the available memory is to be shared evenly among the workers.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "memory-per-worker" in self.json_data or self.json_data["memory-per-worker"] in [None, False, 0]:
+            return None
+        return int(self.json_data["memory-per-worker"])
+
+    def reserved_memory(self):
+        """ Retrieves the amount of memory (in MB) that is not given to the workers but kept for the benchmarking scripts, the operating system, and the page cache.
+            None reserves 10% of the memory but at least 2 GB (see scheduler.get_worker_slots).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if self.json_data.get("reserved-memory") is None:
+            return None
+        return max(0, int(self.json_data["reserved-memory"]))
+
+    def postprocessing_workers(self):
+        """ Retrieves the number of processes used to parse log files (at most the number of cores). By default, logs are parsed sequentially since postprocessing might run on a busy benchmarking machine.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "postprocessing-workers" in self.json_data:
+            return 1
+        return max(1, min(int(self.json_data["postprocessing-workers"]), os.cpu_count()))
+
+    def postprocessing_chunk_size(self):
+        """ Retrieves the number of log files that are handed to a log parsing process at once.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "postprocessing-chunk-size" in self.json_data:
+            return 16
+        return max(1, int(self.json_data["postprocessing-chunk-size"]))
+
+    def journal_filename(self):
+        """ Retrieves the name of the journal file (within the logs directory) that records finished invocations.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "journal-filename" in self.json_data:
+            return "journal.jsonl"
+        return self.json_data["journal-filename"]
+
+    def build_cache_dir(self):
+        """ Retrieves the directory in which built models are cached (or None if models are not cached).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "build-cache-directory" in self.json_data:
+            return None
+        return self.json_data["build-cache-directory"]
+
+    def result_cache_dir(self):
+        """ Retrieves the directory in which execution results are cached (or None if results are not cached). Invocations whose results are cached are not executed again unless execution is forced.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "result-cache-directory" in self.json_data:
+            return None
+        return self.json_data["result-cache-directory"]
+
+    def force_execution(self):
+        """ Retrieves whether invocations are executed even if their results are cached (see result_cache_dir). Usually set using the --force argument of run.py.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if self.forced_execution:
+            return True
+        if not "force-execution" in self.json_data:
+            return False
+        return bool(self.json_data["force-execution"])
+
+    def max_log_size(self):
+        """ Retrieves the maximum size (in bytes) of the output of a single execution. Executions exceeding this limit are aborted and their output is truncated. None means no limit.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "max-log-size-mb" in self.json_data:
+            return 1024 * 1024 * 1024
+        if self.json_data["max-log-size-mb"] is None:
+            return None
+        return int(self.json_data["max-log-size-mb"] * 1024 * 1024)
+
+    def parse_cache_filename(self):
+        """ Retrieves the name of the file (within each logs directory) that caches the results of parsing log files. None disables the cache.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "parse-cache-filename" in self.json_data:
+            return "parse-cache.sqlite"
+        return self.json_data["parse-cache-filename"]
+
+    def batch_properties(self):
+        """ Retrieves whether benchmarks that only differ in their property are checked within a single tool invocation when generating invocations.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "batch-properties" in self.json_data:
+            return False
+        return bool(self.json_data["batch-properties"])
+
+    def warm_up_strategy(self):
+        """ Retrieves how the file cache is warmed up before each measured execution: 'none', 'binary' (prefetch the tool binary), 'prefetch' (prefetch the tool binary and all input files), or 'dry-run' (execute each command with a 5 second time limit first).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "warm-up-strategy" in self.json_data:
+            return "prefetch"
+        if self.json_data["warm-up-strategy"] not in ["none", "binary", "prefetch", "dry-run"]:
+            raise AssertionError("Unknown warm-up strategy '{}'.".format(self.json_data["warm-up-strategy"]))
+        return self.json_data["warm-up-strategy"]
+
+    def sampling_interval(self):
+        """ Retrieves the interval (in seconds) at which the memory usage and CPU time of tool executions are sampled or None if no samples are taken.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "sampling-interval" in self.json_data or self.json_data["sampling-interval"] in [None, False, 0]:
+            return None
+        return float(self.json_data["sampling-interval"])
+
+    def execution_engine(self):
+        """ Retrieves how invocations are executed: 'threads' (each worker process executes one invocation at a time) or 'asyncio' (a single process executes all concurrent invocations using an event loop).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "execution-engine" in self.json_data:
+            return "threads"
+        if self.json_data["execution-engine"] not in ["threads", "asyncio"]:
+            raise AssertionError("Unknown execution engine '{}'.".format(self.json_data["execution-engine"]))
+        return self.json_data["execution-engine"]
+
+    def runtime_history_dirs(self):
+        """ Retrieves the logs directories of previous executions whose wall times are used to balance shards and to order invocations. Invocations without previous results are weighted by their predicted runtime (see predictor_filename) or their time limit.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "runtime-history-directories" in self.json_data:
+            return []
+        return self.json_data["runtime-history-directories"]
+
+    def predictor_filename(self):
+        """ Retrieves the file that stores the runtime predictor (see train_predictor.py). If the file exists, it predicts the runtime of invocations without previous results. None disables the predictor.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "predictor-filename" in self.json_data:
+            return "runtime-predictor.json"
+        return self.json_data["predictor-filename"]
+
+    def prune_dominated_invocations(self):
+        """ Retrieves whether invocations are skipped if the same configuration with a coarser precision (e.g. 'e3' instead of 'e4') already ran into the time or memory limit on the same benchmark. Skipped invocations are stored as (inferred) timeouts.
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "prune-dominated-invocations" in self.json_data:
+            return False
+        return bool(self.json_data["prune-dominated-invocations"])
+
+    def invocation_order(self):
+        """ Retrieves the order in which invocations are executed: 'original' (as created), 'longest-first', or 'shortest-first' (by expected runtime).
+            Note: this is not stored in the settings.json file by default (but can be entered by hand)"""
+        if not "invocation-order" in self.json_data:
+            return "original"
+        if self.json_data["invocation-order"] not in ["original", "longest-first", "shortest-first"]:
+            raise AssertionError("Unknown invocation order '{}'.".format(self.json_data["invocation-order"]))
+        return self.json_data["invocation-order"]
+
     def get_ignored_tools_configs_for_inv_generation(self):
         """ returns a list of tools that should be ignored when generating the invocations """
         if not "ignored-tools-configs-for-inv-generation" in self.json_data:
@@ -0,0 +1,188 @@
+from .utility import *
+from .invocation import *
+from .pruning import execute_invocation
+from datetime import datetime
+import socket, threading, traceback
+
+# The interval (in seconds) at which workers signal that they are still working on their claimed invocation
+HEARTBEAT_INTERVAL = 30.0
+# Claimed invocations without heartbeat for this time (in seconds) are considered abandoned and are put back into the queue
+STALE_TIMEOUT = 300.0
+# The interval (in seconds) at which idle workers check for new (or abandoned) invocations
+POLL_INTERVAL = 10.0
+
+class WorkQueue(object):
+    """
+    A queue of invocations that is stored in a (shared) directory. Any number of workers on any number of hosts can take invocations from the queue.
+    Each invocation is stored in a file that is moved (atomically) from the 'pending' to the 'claimed' and then to the 'done' subdirectory.
+    Invocations whose execution raised an error are moved to the 'failed' subdirectory instead (together with the error). They can be retried by moving them back to the 'pending' subdirectory.
+    A worker regularly touches the heartbeat file of its claimed invocation. Invocations whose worker stopped doing so are put back into the 'pending' subdirectory.
+    """
+    def __init__(self, path : str):
+        self.path = path
+        self.pending_dir = os.path.join(path, "pending")
+        self.claimed_dir = os.path.join(path, "claimed")
+        self.done_dir = os.path.join(path, "done")
+        self.failed_dir = os.path.join(path, "failed") # created when the first invocation fails
+
+    def exists(self):
+        return all([os.path.isdir(d) for d in [self.pending_dir, self.claimed_dir, self.done_dir]])
+
+    def create(self, invocations):
+        """ Creates the queue with the given invocations (which are processed in the given order). """
+        if os.path.exists(self.path) and len(os.listdir(self.path)) > 0:
+            raise AssertionError("Unable to create work queue: '{}' is not empty.".format(self.path))
+        for d in [self.pending_dir, self.claimed_dir, self.done_dir]:
+            ensure_directory(d)
+        for index, invocation in enumerate(invocations):
+            save_json(invocation.to_json(), os.path.join(self.pending_dir, "{:06d}.{}.json".format(index, invocation.get_identifier())))
+
+    def _get_entries(self, directory):
+        return sorted([f for f in os.listdir(directory) if f.endswith(".json")])
+
+    def _get_heartbeat_file(self, entry):
+        return os.path.join(self.claimed_dir, entry[:-len(".json")] + ".heartbeat")
+
+    def get_status(self):
+        """ Returns the number of pending, claimed, done, and failed invocations. """
+        num_failed = len(self._get_entries(self.failed_dir)) if os.path.isdir(self.failed_dir) else 0
+        return len(self._get_entries(self.pending_dir)), len(self._get_entries(self.claimed_dir)), len(self._get_entries(self.done_dir)), num_failed
+
+    def get_time(self):
+        """ Returns the current time of the (possibly remote) file system, which is the time base of the heartbeats. """
+        clock_file = os.path.join(self.path, "clock")
+        with open(clock_file, 'a'):
+            pass
+        os.utime(clock_file, None)
+        return os.stat(clock_file).st_mtime
+
+    def claim(self):
+        """ Claims the next pending invocation. Returns the entry (i.e. the name of its file) and the invocation or None if there are no pending invocations. """
+        for entry in self._get_entries(self.pending_dir):
+            try:
+                os.rename(os.path.join(self.pending_dir, entry), os.path.join(self.claimed_dir, entry))
+            except OSError:
+                continue # claimed by another worker in the meantime
+            self.heartbeat(entry)
+            return entry, Invocation(load_json(os.path.join(self.claimed_dir, entry)))
+        return None
+
+    def heartbeat(self, entry):
+        """ Signals that the given claimed invocation is still being worked on. Returns false if the invocation is no longer claimed by this worker. """
+        if not os.path.isfile(os.path.join(self.claimed_dir, entry)):
+            return False
+        with open(self._get_heartbeat_file(entry), 'w') as heartbeat_file:
+            heartbeat_file.write("{} {}\n".format(socket.gethostname(), os.getpid()))
+        return True
+
+    def _remove_heartbeat(self, entry):
+        try:
+            os.remove(self._get_heartbeat_file(entry))
+        except OSError:
+            pass
+
+    def complete(self, entry):
+        """ Marks the given claimed invocation as done. Returns false if the invocation has been put back into the queue in the meantime. """
+        self._remove_heartbeat(entry)
+        try:
+            os.rename(os.path.join(self.claimed_dir, entry), os.path.join(self.done_dir, entry))
+            return True
+        except OSError:
+            return False
+
+    def fail(self, entry, error : str):
+        """ Marks the given claimed invocation as failed and stores the given error message next to it. Returns false if the invocation has been put back into the queue in the meantime. """
+        self._remove_heartbeat(entry)
+        ensure_directory(self.failed_dir)
+        try:
+            os.rename(os.path.join(self.claimed_dir, entry), os.path.join(self.failed_dir, entry))
+        except OSError:
+            return False
+        with open(os.path.join(self.failed_dir, entry[:-len(".json")] + ".error"), 'w') as error_file:
+            error_file.write(error)
+        return True
+
+    def release(self, entry):
+        """ Puts the given claimed invocation back into the queue (e.g. because the worker got interrupted). """
+        self._remove_heartbeat(entry)
+        try:
+            os.rename(os.path.join(self.claimed_dir, entry), os.path.join(self.pending_dir, entry))
+        except OSError:
+            pass
+
+    def requeue_stale(self):
+        """ Puts claimed invocations whose worker did not send a heartbeat for a while back into the queue. Returns the number of such invocations. """
+        now = self.get_time()
+        num_requeued = 0
+        for entry in self._get_entries(self.claimed_dir):
+            try:
+                stat = os.stat(self._get_heartbeat_file(entry))
+            except OSError:
+                try:
+                    # the invocation has just been claimed (renaming updates the ctime) and the heartbeat is not written yet
+                    stat = os.stat(os.path.join(self.claimed_dir, entry))
+                except OSError:
+                    continue
+            if now - max(stat.st_mtime, stat.st_ctime) > STALE_TIMEOUT:
+                # the heartbeat is removed first: once the invocation is pending again, another worker might claim it and write a fresh heartbeat
+                self._remove_heartbeat(entry)
+                try:
+                    os.rename(os.path.join(self.claimed_dir, entry), os.path.join(self.pending_dir, entry))
+                except OSError:
+                    continue # requeued or completed by another worker in the meantime
+                num_requeued += 1
+                print("Put abandoned invocation '{}' back into the queue.".format(entry))
+        return num_requeued
+
+def _send_heartbeats(queue, entry, stopped):
+    while not stopped.wait(HEARTBEAT_INTERVAL):
+        if not queue.heartbeat(entry):
+            print("\nWarning: Invocation '{}' has been put back into the queue by another worker.".format(entry))
+            break
+
+def run_queue_worker(settings, queue):
+    """ Executes invocations from the given queue until all invocations are done. """
+    if not queue.exists():
+        raise AssertionError("Work queue '{}' does not exist.".format(queue.path))
+    print("Worker {} on host {} processing queue '{}'.".format(os.getpid(), socket.gethostname(), queue.path))
+    num_executed = 0
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            queue.requeue_stale()
+            num_pending, num_claimed, num_done, num_failed = queue.get_status()
+            if num_pending == 0 and num_claimed == 0:
+                break
+            if num_pending == 0:
+                time.sleep(POLL_INTERVAL) # other workers might die, leaving their invocations to us
+            continue
+        entry, invocation = claimed
+        stopped = threading.Event()
+        heartbeat_thread = threading.Thread(target=_send_heartbeats, args=(queue, entry, stopped), daemon=True)
+        heartbeat_thread.start()
+        error = None
+        try:
+            num_pending, num_claimed, num_done, num_failed = queue.get_status()
+            print("{} Executing invocation {} ({} pending, {} claimed, {} done, {} failed)".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), invocation.get_identifier(), num_pending, num_claimed, num_done, num_failed))
+            execute_invocation(settings, invocation)
+        except KeyboardInterrupt:
+            stopped.set()
+            queue.release(entry)
+            print("\nInterrupt while processing invocation {}. It has been put back into the queue.".format(invocation.get_identifier()))
+            return
+        except Exception:
+            error = traceback.format_exc()
+            print("ERROR while processing invocation {}:\n{}".format(invocation.get_identifier(), error))
+        stopped.set()
+        heartbeat_thread.join()
+        if error is not None:
+            # without results, the invocation must not count as done
+            if not queue.fail(entry, error):
+                print("Warning: Invocation '{}' has been put back into the queue by another worker before it failed.".format(entry))
+        elif not queue.complete(entry):
+            print("Warning: Invocation '{}' has been put back into the queue by another worker before it was completed.".format(entry))
+        num_executed += 1
+    num_pending, num_claimed, num_done, num_failed = queue.get_status()
+    print("No more invocations in queue '{}'. Executed {} invocations.".format(queue.path, num_executed))
+    if num_failed > 0:
+        print("{} invocations failed. Their errors are stored in '{}'. To retry them, move them back to '{}'.".format(num_failed, queue.failed_dir, queue.pending_dir))
@@ -5,6 +5,14 @@ from internal import storm
 from internal import mcsta
 from internal.invocation import *
 from internal.input import *
+from internal.scheduler import *
+from internal.journal import *
+from internal.asyncengine import run_invocations_async
+from internal.runtimes import get_shard, order_invocations
+from internal.pruning import order_precision_sweeps, execute_invocation
+from internal.deepening import run_invocations_in_rounds
+from internal.repetition import run_invocations_adaptively
+from internal.workqueue import WorkQueue, run_queue_worker
 from datetime import datetime
 
 import traceback
@@ -102,9 +110,25 @@ def create_invocations(settings):
         for benchmark in selected_benchmarks_per_property[property_type_str]:
             selected_benchmarks.append(benchmark)
 
-    num_runs = input_number_of_runs()
+    # benchmarks that only differ in their property might be checked within a single invocation
+    if settings.batch_properties():
+        benchmark_batches = OrderedDict()
+        for benchmark in selected_benchmarks:
+            if benchmark.get_instance_identifier() not in benchmark_batches:
+                benchmark_batches[benchmark.get_instance_identifier()] = []
+            benchmark_batches[benchmark.get_instance_identifier()].append(benchmark)
+        benchmark_batches = list(benchmark_batches.values())
+        print("Batching properties of the same model instance yields {} batches of {} benchmarks.".format(len(benchmark_batches), len(selected_benchmarks)))
+    else:
+        benchmark_batches = [[benchmark] for benchmark in selected_benchmarks]
+
+    if settings.repetition_target() is None:
+        num_runs = input_number_of_runs()
+    else:
+        num_runs = 1 # further runs are added while executing the invocations
+        print("Invocations are repeated until the 95% confidence interval of their wall time is within {}% of the mean (at most {} runs).".format(settings.repetition_target() * 100, settings.max_repetitions()))
     num_configurations = sum([len(cfgs) for cfgs in selected_configurations.values()])
-    num_invocations = len(selected_benchmarks) * num_configurations * num_runs
+    num_invocations = len(benchmark_batches) * num_configurations * num_runs
     print("Selected {} benchmarks and {} configurations {}yielding {} invocations in total.".format(len(selected_benchmarks), num_configurations, "" if num_invocations == 1 else " and {} repetitions ".format(num_runs), num_invocations))
     
     input_time_limit(settings)
@@ -114,22 +138,26 @@ def create_invocations(settings):
     progressbar = Progressbar(num_invocations, "Generating invocations")
     i = 0
     unsupported = []
-    for benchmark in selected_benchmarks:
+    for batch in benchmark_batches:
+        benchmark = batch[0]
+        batch = batch if len(batch) > 1 else None
         for tool in selected_configurations:    
             for configuration in selected_configurations[tool]:
                 for run_id in range(1, num_runs + 1):
                     i += 1
                     progressbar.print_progress(i)
                     if tool == storm.get_name():
-                        invocation = storm.get_invocation(settings, benchmark, configuration, run_id)
+                        invocation = storm.get_invocation(settings, benchmark, configuration, run_id, batch)
                     elif tool == mcsta.get_name():
-                        invocation = mcsta.get_invocation(settings, benchmark, configuration, run_id)
+                        invocation = mcsta.get_invocation(settings, benchmark, configuration, run_id, batch)
                     else:
                         raise AssertionError("tool {} unknown.".format(tool))
                     if len(invocation.commands) == 0:
                         unsupported.append(invocation.get_identifier() + ": " + invocation.note)
                     else:
-                        invocation.time_limit = settings.time_limit()
+                        # each benchmark of a batch gets the full time limit
+                        invocation.time_limit = settings.time_limit() * len(invocation.get_benchmark_ids())
+                        invocation.memory_limit = settings.memory_limit()
                         invocations.append(invocation)
     print("")
     if len(unsupported) > 0:
@@ -156,18 +184,20 @@ def check_invocations(settings, invocations):
             # check whether there are no commands
             if len(invocation.commands) == 0:
                 continue
-            benchmark = get_benchmark_from_id(settings, invocation.benchmark_id)
-            # ensure that the actual benchmark files exist
-            for filename in benchmark.get_all_filenames():
-                if not os.path.isfile(os.path.join(benchmark.get_directory(), filename)):
-                    raise AssertionError(
-                        "The file '{}' does not exist.".format(os.path.join(benchmark.get_directory(), filename)))
-            # ensure that the invocation identifier (consisting of benchmark and configuration id) can be a filename and are unique
-            if not is_valid_filename(invocation.get_identifier(), "/"):
-                raise AssertionError("Invocation identifier '{}' is either not a valid filename or contains a '.'.".format(invocation.get_identifier()))
-            if invocation.get_identifier() in invocation_identifiers:
-                raise AssertionError("Invocation identifier '{}' already exists.".format(invocation.get_identifier()))
-            invocation_identifiers.add(invocation.get_identifier())
+            for benchmark_id in invocation.get_benchmark_ids():
+                benchmark = get_benchmark_from_id(settings, benchmark_id)
+                # ensure that the actual benchmark files exist
+                for filename in benchmark.get_all_filenames():
+                    if not os.path.isfile(os.path.join(benchmark.get_directory(), filename)):
+                        raise AssertionError(
+                            "The file '{}' does not exist.".format(os.path.join(benchmark.get_directory(), filename)))
+                # ensure that the invocation identifier (consisting of benchmark and configuration id) can be a filename and are unique
+                identifier = invocation.get_identifier(benchmark_id)
+                if not is_valid_filename(identifier, "/"):
+                    raise AssertionError("Invocation identifier '{}' is either not a valid filename or contains a '.'.".format(identifier))
+                if identifier in invocation_identifiers:
+                    raise AssertionError("Invocation identifier '{}' already exists.".format(identifier))
+                invocation_identifiers.add(identifier)
         except Exception:
             print("Error when checking invocation #{}: {}".format(invocation_number - 1, invocation.get_identifier()))
             traceback.print_exc()
@@ -176,6 +206,29 @@ def check_invocations(settings, invocations):
     return result
     
 def run_invocations(settings, invocations):
+    journal = get_journal(settings)
+    if settings.repetition_target() is None:
+        invocations = remove_completed_invocations(settings, journal, invocations)
+        if len(invocations) == 0:
+            print("All invocations are already completed.")
+            return
+    invocations = order_invocations(settings, invocations)
+    if settings.prune_dominated_invocations():
+        invocations = order_precision_sweeps(invocations)
+    if settings.repetition_target() is not None:
+        # the number of runs is determined while executing (completed runs are skipped)
+        run_invocations_adaptively(settings, invocations, journal, execute_invocations)
+    elif settings.initial_time_limit() is not None:
+        run_invocations_in_rounds(settings, invocations, journal, execute_invocations)
+    else:
+        execute_invocations(settings, invocations, journal)
+
+def execute_invocations(settings, invocations, journal = None):
+    """ Executes the given invocations (using the configured execution engine) and records them in the given journal (if any). Returns false if the execution got interrupted. """
+    if settings.execution_engine() == "asyncio":
+        return run_invocations_async(settings, invocations, journal)
+    if settings.num_workers() > 1 and len(invocations) > 1:
+        return run_invocations_in_parallel(settings, invocations, journal)
     invocation_number = 0
     if len(invocations) > 1:
         progressbar = Progressbar(len(invocations), "Executing invocations")
@@ -188,21 +241,19 @@ def run_invocations(settings, invocations):
             benchmark = get_benchmark_from_id(settings, invocation.benchmark_id)
             if len(invocations) > 1:
                 progressbar.print_progress(invocation_number)
-            # execute the invocation
-            execution = invocation.execute()
-            execution_result = execution.to_json()
-            logfile_name = invocation.get_identifier() + ".log"
-            execution_result["log"] = logfile_name
-            # save logfile
-            with open(os.path.join(settings.logs_dir(), logfile_name), 'w', encoding="utf-8") as logfile:
-                logfile.write(execution.concatenate_logs())
-            # save execution results in json format
-            save_json(execution_result, os.path.join(settings.logs_dir(), invocation.get_identifier() + ".json"))
+            # execute the invocation and save the results
+            next_invocation = invocations[invocation_number] if invocation_number < len(invocations) else None
+            execution_result = execute_invocation(settings, invocation, next_invocation)
+            if journal is not None:
+                journal.record(invocation.get_identifier(), execution_result)
     except KeyboardInterrupt as e:
         print("\nInterrupt while processing invocation #{}: {}".format(invocation_number - 1, invocation.get_identifier()))
+        return False
     except Exception:
         print("ERROR while processing invocation #{}: {}".format(invocation_number - 1, invocation.get_identifier()))
         traceback.print_exc()
+        return False
+    return True
     
 if __name__ == "__main__":
     #print current time and date
@@ -212,15 +263,47 @@ if __name__ == "__main__":
     print("python3 {}                            Creates an invocations file.".format(sys.argv[0]))
     print("python3 {} <filename>                 Executes benchmarks from a previously created invocations file located at <filename>.".format(sys.argv[0]))
     print("python3 {} <filename> <i>             Executes the <i>th invocation (0 based) from a previously created invocations file located at <filename>.".format(sys.argv[0]))
+    print("python3 {} <filename> --shard <k>/<N> Executes the <k>th of <N> shards (1 based) of a previously created invocations file located at <filename>. Shards are balanced by expected runtime and store their results in their own subdirectory of the logs directory.".format(sys.argv[0]))
+    print("python3 {} queue init <dir> <filename> Creates a work queue in the (shared) directory <dir> with the invocations from the invocations file located at <filename>.".format(sys.argv[0]))
+    print("python3 {} queue work <dir>           Executes invocations from the work queue in <dir> until it is empty. Any number of workers on any number of hosts may process the same queue.".format(sys.argv[0]))
+    print("python3 {} queue status <dir>         Prints the number of pending, claimed, and done invocations of the work queue in <dir>.".format(sys.argv[0]))
+    print("python3 {} <filename> ... --force     Executes invocations even if their results are in the result cache (if the 'result-cache-directory' setting is given).".format(sys.argv[0]))
     print("python3 {} merge <file1> <file2> ...  Merges previously created (and disjoint) invocation files located at <file1>, <file2>, ....".format(sys.argv[0]))
     print("")
-    if (len(sys.argv) == 2 and sys.argv[1] in ["-h", "-help", "--help"]) or (len(sys.argv) > 3 and sys.argv[1] != "merge"):
+    force = "--force" in sys.argv
+    if force:
+        sys.argv.remove("--force")
+    is_shard = len(sys.argv) == 4 and sys.argv[2] == "--shard"
+    is_queue = len(sys.argv) > 1 and sys.argv[1] == "queue"
+    if is_queue and not ((len(sys.argv) == 5 and sys.argv[2] == "init") or (len(sys.argv) == 4 and sys.argv[2] in ["work", "status"])):
+        print("ERROR: Invalid arguments.)")
+        exit(1)
+    if (len(sys.argv) == 2 and sys.argv[1] in ["-h", "-help", "--help"]) or (len(sys.argv) > 3 and sys.argv[1] != "merge" and not is_shard and not is_queue):
         print("ERROR: Invalid arguments.)")
         exit(1)
     
     settings = Settings()
+    settings.forced_execution = force
     
-    if len(sys.argv) == 1 or sys.argv[1] == "merge":
+    if is_queue:
+        queue = WorkQueue(sys.argv[3])
+        if sys.argv[2] == "init":
+            if not os.path.isfile(sys.argv[4]):
+                raise AssertionError("Invocations file {} does not exist".format(sys.argv[4]))
+            invocations = [Invocation(inv) for inv in load_json(sys.argv[4])]
+            check_invocations(settings, invocations)
+            invocations = order_invocations(settings, invocations)
+            if settings.prune_dominated_invocations():
+                invocations = order_precision_sweeps(invocations)
+            queue.create(invocations)
+            print("Created work queue '{}' with {} invocations. To process it, run\n\tpython3 {} queue work {}\non any number of hosts that share this directory.".format(queue.path, len(invocations), sys.argv[0], queue.path))
+        elif sys.argv[2] == "work":
+            run_queue_worker(settings, queue)
+            print("\n{} Finished execution of invocations".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        else:
+            if not queue.exists(): raise AssertionError("Work queue '{}' does not exist.".format(queue.path))
+            print("{} pending, {} claimed, {} done, {} failed".format(*queue.get_status()))
+    elif len(sys.argv) == 1 or sys.argv[1] == "merge":
         # generate new invocations or merge existing once
         if len(sys.argv) == 1:
             input("No invocations file loaded. Press Return to create one now or CTRL+C to abort.")
@@ -262,7 +345,16 @@ if __name__ == "__main__":
         invocations_json = load_json(sys.argv[1])
         invocations = [Invocation(inv) for inv in invocations_json]
         print("{} Loaded {} invocations.".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(invocations)))
-        if len(sys.argv) == 3:
+        if is_shard:
+            shard = sys.argv[3].split("/")
+            if len(shard) != 2 or not shard[0].isdigit() or not shard[1].isdigit():
+                raise AssertionError("Expected a shard of the form '<k>/<N>' but got '{}' instead.".format(sys.argv[3]))
+            shard_index, num_shards = int(shard[0]), int(shard[1])
+            invocations, expected_runtime = get_shard(settings, invocations, shard_index, num_shards)
+            # each shard has its own logs directory so that shards running concurrently do not interfere with each other
+            settings.json_data["logs-directory-name"] = os.path.join(settings.logs_dir(), get_shard_directory_name(shard_index, num_shards))
+            print("Selected shard {} of {} with {} invocations and an expected runtime of {:.0f} seconds. Results are stored in '{}'.".format(shard_index, num_shards, len(invocations), expected_runtime, settings.logs_dir()))
+        elif len(sys.argv) == 3:
             if not is_number(sys.argv[2]): raise AssertionError("Expected a number for second argument but got '{}' instead.".format(sys.argv[2]))
             selected_index = int(sys.argv[2])
             if selected_index not in range(0,len(invocations)): raise AssertionError("Second argument is out of range: got '{}' but index has to be at least 0 at less than {}".format(selected_index, len(invocations)))
@@ -0,0 +1,32 @@
+from internal.processlogs import *
+from internal.predictor import *
+from internal.utility import *
+import sys
+import os
+
+if __name__ == "__main__":
+    print("Benchmarking tool.")
+    print("This script trains a predictor for the runtime of invocations on the executions of previous runs.")
+    print("Usage:")
+    print("python3 {} <log_dir1> <log_dir2> ...".format(sys.argv[0]))
+    print("Reads logfiles from the given directories and stores the predictor in the file given by the 'predictor-filename' setting.")
+    print("")
+    if len(sys.argv) < 2:
+        exit(1)
+    logdirs = sys.argv[1:]
+    for logdir in logdirs:
+        if not os.path.isdir(logdir):
+            print("Error: log directory '{}' does not exist.".format(logdir))
+            exit(1)
+
+    settings = Settings()
+    if settings.predictor_filename() is None:
+        print("Error: the runtime predictor is disabled in the settings.")
+        exit(1)
+
+    groups_tools_configs = get_all_groups_tools_configs(logdirs) # group names are derived from the directory names
+    exec_data = gather_execution_data(settings, logdirs, groups_tools_configs)  # Group -> Tool -> Config -> Benchmark -> [Data array]
+    predictor = train_predictor(settings, exec_data)
+    save_predictor(predictor, settings.predictor_filename())
+    print("Trained runtime predictor on {} executions ({} timeouts) with {} features (standard deviation of the log runtime: {:.2f}).".format(predictor.num_samples, predictor.num_timeouts, len(predictor.features), predictor.runtime_deviation))
+    print("Saved runtime predictor to '{}'.".format(settings.predictor_filename()))